@@ -17,6 +17,11 @@ def create_app(config_name='default'):
     # Create Flask app instance
     app = Flask(__name__)
 
+    # Stream uploads straight to job storage instead of spooling them in memory
+    from app.uploads import UploadRequest, discard_unqueued_spools
+    app.request_class = UploadRequest
+    app.teardown_request(discard_unqueued_spools)
+
     # Load configuration
     app.config.from_object(config_options[config_name])
 
@@ -70,6 +75,10 @@ def create_app(config_name='default'):
     with app.app_context():
         db.create_all()
         app.logger.debug("Database tables created (if needed)")
+        # Tables created by older versions are brought up to date by `flask db upgrade`
+
+        from app.search import init_link_search
+        init_link_search(app)
 
         # Create admin user if doesn't exist
         from app.models import User
@@ -1,62 +1,299 @@
-from flask import Blueprint, jsonify
+from typing import Iterator, Optional
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from flask_login import current_user, login_required
-from app.models import Spreadsheet, Sheet, Link
+from sqlalchemy import select, tuple_
+from app.database import stream_rows
+from app.models import Spreadsheet, Sheet, Link, db
+from app.bulk import DEFAULT_BULK_BATCH_SIZE, NDJSON_MIMETYPES, sync_links
+from app.pagination import (
+    DEFAULT_MAX_ITEMS_PER_PAGE, InvalidPageRequest, dashboard_page_bounds, page_limit, section_links_page,
+    sheet_sort_key
+)
+from app.search import DEFAULT_MAX_SEARCH_RESULTS, DEFAULT_SEARCH_RESULTS, find_links
+import json
 import logging
 
 # Initialize Blueprint and logger
 api_bp = Blueprint('api', __name__)
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip, and links written per response block, by /api/dashboard-data
+DASHBOARD_YIELD_PER = 2000
+
 
 @api_bp.route('/api/dashboard-data', methods=['GET'])
 @login_required
 def dashboard_data():
     """
     API endpoint that provides data for the dashboard if the user has uploaded spreadsheets.
+
+    Everything comes from one flat spreadsheet/sheet/link query read
+    DASHBOARD_YIELD_PER rows at a time, and the JSON document is written out
+    as it is read, so neither the query count nor memory grows with the data.
+
+    With ``limit`` or ``after`` the response is one page of ``limit`` sheets
+    (ITEMS_PER_PAGE by default) in spreadsheet and sheet id order, plus a
+    ``next_cursor`` to pass as ``after`` for the following page. A page
+    carries all links of its sheets, so a very large sheet still streams in
+    one response; /api/sections/<id>/links pages through a single sheet.
     """
     try:
         # Ensure the user has uploaded at least one spreadsheet
-        user_spreadsheets = Spreadsheet.query.filter_by(user_id=current_user.id).all()
-        if not user_spreadsheets:
+        has_spreadsheets = db.session.execute(
+            select(Spreadsheet.id).where(Spreadsheet.user_id == current_user.id).limit(1)
+        ).first()
+        if not has_spreadsheets:
             return jsonify({
                 "status": "error",
                 "message": "No spreadsheets available. Please upload a file to access data."
             }), 403
 
-        # Prepare dashboard data
-        dashboard_items = []
-        for spreadsheet in user_spreadsheets:
-            spreadsheet_data = {
-                "spreadsheet_name": spreadsheet.name,
-                "created_at": spreadsheet.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                "sheets": []
-            }
-
-            for sheet in spreadsheet.sheets:
-                sheet_data = {
-                    "sheet_name": sheet.name,
-                    "links": [
-                        {
-                            "id": link.id,
-                            "title": link.title,
-                            "url": link.link,
-                            "status": link.status
-                        }
-                        for link in sheet.links
-                    ]
-                }
-                spreadsheet_data["sheets"].append(sheet_data)
-
-            dashboard_items.append(spreadsheet_data)
+        if 'limit' not in request.args and 'after' not in request.args:
+            rows = dashboard_rows(current_user.id)
+            return Response(stream_with_context(iter_dashboard_json(rows)), mimetype='application/json')
+
+        limit = requested_page_limit()
+        after, until, next_cursor = dashboard_page_bounds(current_user.id, limit, request.args.get('after'))
+        rows = dashboard_rows(current_user.id, after, until) if until else []
+        return Response(
+            stream_with_context(iter_dashboard_json(rows, paginated=True, next_cursor=next_cursor)),
+            mimetype='application/json'
+        )
+
+    except InvalidPageRequest as e:
+        return invalid_page_response(e)
+    except Exception as e:
+        logger.error(f"Error in /api/dashboard-data: {e}", exc_info=True)
+        return jsonify({
+            "status": "error",
+            "message": "An error occurred while fetching dashboard data."
+        }), 500
+
+
+def dashboard_rows(user_id: int, after: Optional[tuple] = None, until: Optional[tuple] = None):
+    """
+    The user's spreadsheets, sheets and links as flat rows in spreadsheet,
+    sheet and link order; outer joins keep spreadsheets and sheets with no links.
+    ``after`` and ``until`` bound the (spreadsheet id, sheet id) range for a page.
+    The query runs on its own connection when the response body is first read.
+    """
+    statement = (
+        select(
+            Spreadsheet.id, Spreadsheet.name, Spreadsheet.created_at,
+            Sheet.id, Sheet.name,
+            Link.id, Link.title, Link.link, Link.status
+        )
+        .select_from(Spreadsheet)
+        .outerjoin(Sheet, Sheet.spreadsheet_id == Spreadsheet.id)
+        .outerjoin(Link, Link.sheet_id == Sheet.id)
+        .where(Spreadsheet.user_id == user_id)
+        .order_by(Spreadsheet.id, Sheet.id, Link.id)
+    )
+    if after:
+        statement = statement.where(sheet_sort_key() > tuple_(*after))
+    if until:
+        statement = statement.where(sheet_sort_key() <= tuple_(*until))
+    return stream_rows(statement, DASHBOARD_YIELD_PER)
+
+
+def iter_dashboard_json(rows, paginated: bool = False, next_cursor: Optional[str] = None) -> Iterator[str]:
+    """Write flat dashboard rows as the nested dashboard_data document, one block per DASHBOARD_YIELD_PER links"""
+    parts = ['{"status": "success", "dashboard_data": [']
+    current_spreadsheet = current_sheet = None
+    first_link = True
+    link_count = 0
+
+    try:
+        for spreadsheet_id, spreadsheet_name, created_at, sheet_id, sheet_name, link_id, title, url, status in rows:
+            if spreadsheet_id != current_spreadsheet:
+                if current_spreadsheet is not None:
+                    parts.append(']}, ' if current_sheet is None else ']}]}, ')
+                parts.append(
+                    f'{{"spreadsheet_name": {json.dumps(spreadsheet_name)}, '
+                    f'"created_at": {json.dumps(created_at.strftime("%Y-%m-%d %H:%M:%S") if created_at else None)}, '
+                    f'"sheets": ['
+                )
+                current_spreadsheet, current_sheet = spreadsheet_id, None
+
+            if sheet_id is not None and sheet_id != current_sheet:
+                if current_sheet is not None:
+                    parts.append(']}, ')
+                parts.append(f'{{"sheet_name": {json.dumps(sheet_name)}, "links": [')
+                current_sheet, first_link = sheet_id, True
+
+            if link_id is not None:
+                if not first_link:
+                    parts.append(', ')
+                parts.append(json.dumps({"id": link_id, "title": title, "url": url, "status": status}))
+                first_link = False
+                link_count += 1
+                if link_count % DASHBOARD_YIELD_PER == 0:
+                    yield ''.join(parts)
+                    parts = []
+    except Exception as e:
+        # Headers are already sent; the truncated body will not parse, which the client treats as an error
+        logger.error(f"Error streaming /api/dashboard-data: {e}", exc_info=True)
+        return
+
+    if current_spreadsheet is not None:
+        parts.append(']}' if current_sheet is None else ']}]}')
+    parts.append(f'], "next_cursor": {json.dumps(next_cursor)}}}' if paginated else ']}')
+    yield ''.join(parts)
+
 
+def requested_page_limit() -> int:
+    return page_limit(
+        request.args.get('limit'),
+        current_app.config.get('ITEMS_PER_PAGE', 20),
+        current_app.config.get('MAX_ITEMS_PER_PAGE', DEFAULT_MAX_ITEMS_PER_PAGE)
+    )
+
+
+def invalid_page_response(error: InvalidPageRequest):
+    return jsonify({
+        "status": "error",
+        "message": str(error),
+        "error_code": "INVALID_PAGE_REQUEST"
+    }), 400
+
+
+@api_bp.route('/api/sections/<int:section_id>/links', methods=['GET'])
+@login_required
+def section_links(section_id):
+    """
+    One page of a section's links, pinned first and then in id order.
+
+    ``limit`` defaults to ITEMS_PER_PAGE; pass the response's ``next_cursor``
+    as ``after`` to continue. Every page costs the same however deep it is.
+    """
+    try:
+        section = db.session.execute(
+            select(Sheet.id, Sheet.name)
+            .join(Spreadsheet, Spreadsheet.id == Sheet.spreadsheet_id)
+            .where(Sheet.id == section_id, Spreadsheet.user_id == current_user.id)
+        ).first()
+        if not section:
+            return jsonify({
+                "status": "error",
+                "message": "Section not found or access denied"
+            }), 404
+
+        rows, next_cursor = section_links_page(section.id, requested_page_limit(), request.args.get('after'))
         return jsonify({
             "status": "success",
-            "dashboard_data": dashboard_items
+            "section_id": section.id,
+            "links": [
+                {"id": link_id, "title": title, "url": url, "status": status or 'unknown', "pinned": bool(pinned)}
+                for link_id, title, url, status, pinned in rows
+            ],
+            "next_cursor": next_cursor
         })
 
+    except InvalidPageRequest as e:
+        return invalid_page_response(e)
     except Exception as e:
-        logger.error(f"Error in /api/dashboard-data: {e}", exc_info=True)
+        logger.error(f"Error in /api/sections/{section_id}/links: {e}", exc_info=True)
         return jsonify({
             "status": "error",
-            "message": "An error occurred while fetching dashboard data."
+            "message": "An error occurred while fetching section links."
         }), 500
+
+
+@api_bp.route('/api/search', methods=['GET'])
+@login_required
+def search_links():
+    """
+    Search all of the user's links by title and URL, best matches first.
+
+    ``q`` is the query; every whitespace-separated term in it must occur
+    somewhere in the title or URL. ``limit`` (SEARCH_RESULTS by default) caps the results, and
+    ``section_id`` narrows the search to one section. Each result carries
+    its section and HTML-escaped ``title_highlight``/``url_highlight`` with
+    the matches wrapped in <mark>.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({
+            "status": "error",
+            "message": "'q' is required",
+            "error_code": "INVALID_SEARCH_REQUEST"
+        }), 400
+
+    try:
+        limit = page_limit(
+            request.args.get('limit'),
+            current_app.config.get('SEARCH_RESULTS', DEFAULT_SEARCH_RESULTS),
+            current_app.config.get('MAX_SEARCH_RESULTS', DEFAULT_MAX_SEARCH_RESULTS)
+        )
+        section_id = request.args.get('section_id', type=int)
+        if section_id is not None and not db.session.execute(
+                select(Sheet.id)
+                .join(Spreadsheet, Spreadsheet.id == Sheet.spreadsheet_id)
+                .where(Sheet.id == section_id, Spreadsheet.user_id == current_user.id)
+        ).first():
+            return jsonify({
+                "status": "error",
+                "message": "Section not found or access denied"
+            }), 404
+
+        return jsonify({
+            "status": "success",
+            "query": query,
+            "results": find_links(current_user.id, query, limit, section_id=section_id)
+        })
+
+    except InvalidPageRequest as e:
+        return invalid_page_response(e)
+    except Exception as e:
+        logger.error(f"Error in /api/search: {e}", exc_info=True)
+        return jsonify({
+            "status": "error",
+            "message": "An error occurred while searching links."
+        }), 500
+
+
+@api_bp.route('/api/links/bulk', methods=['POST'])
+@login_required
+def bulk_links():
+    """
+    Apply a streamed NDJSON body of link operations, one JSON object per line:
+
+        {"op": "upsert", "section_id": 3, "url": "https://...", "title": "...", "status": "Active", "pinned": false}
+        {"op": "delete", "section_id": 3, "url": "https://..."}
+
+    Operations are keyed by section and URL and applied in transactions of
+    BULK_BATCH_SIZE lines while the body is still being read. The response
+    lists each batch's counts and the lines it rejected.
+    """
+    if request.mimetype not in NDJSON_MIMETYPES:
+        return jsonify({
+            "status": "error",
+            "message": "Expected an application/x-ndjson body",
+            "error_code": "UNSUPPORTED_MEDIA_TYPE"
+        }), 415
+
+    try:
+        batch_size = current_app.config.get('BULK_BATCH_SIZE', DEFAULT_BULK_BATCH_SIZE)
+        batches = sync_links(current_user.id, request.stream, batch_size)
+    except Exception as e:
+        logger.error(f"Error in /api/links/bulk: {e}", exc_info=True)
+        return jsonify({
+            "status": "error",
+            "message": "An error occurred while applying link operations."
+        }), 500
+
+    totals = {key: sum(batch[key] for batch in batches) for key in ("inserted", "updated", "deleted")}
+    error_count = sum(len(batch["errors"]) for batch in batches)
+    failed = sum(1 for batch in batches if batch["status"] == "failed")
+    logger.info(
+        f"Bulk link sync for user {current_user.id}: {len(batches)} batches, {totals}, "
+        f"{error_count} rejected lines, {failed} failed batches"
+    )
+
+    return jsonify({
+        "status": "success" if not error_count and not failed else "partial",
+        **totals,
+        "rejected": error_count,
+        "failed_batches": failed,
+        "batches": batches
+    })
@@ -0,0 +1,241 @@
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import bindparam, delete, insert, select, tuple_, update
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import Spreadsheet, Sheet, Link, db
+from app.utils import LinkKeys, row_hash
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+BULK_OPERATIONS = {'upsert', 'delete'}
+NDJSON_MIMETYPES = {'application/x-ndjson', 'application/ndjson', 'application/jsonl'}
+
+# Operations applied per transaction (overridable via BULK_BATCH_SIZE)
+DEFAULT_BULK_BATCH_SIZE = 1000
+
+# Column limits from app.models.Link
+TITLE_MAX_LENGTH = 255
+STATUS_MAX_LENGTH = 100
+
+
+class LinkOperation:
+    """One parsed line of a bulk request, keyed by (section_id, url)"""
+
+    def __init__(self, line: int, op: str, section_id: int, url: str,
+                 title: Optional[str] = None, status: Optional[str] = None, pinned: Optional[bool] = None):
+        self.line = line
+        self.op = op
+        self.section_id = section_id
+        self.url = url
+        self.title = title
+        self.status = status
+        self.pinned = pinned
+
+    @property
+    def key(self) -> Tuple[int, str]:
+        return self.section_id, self.url
+
+
+def parse_operation(line_number: int, line: bytes) -> LinkOperation:
+    """Parse and check one NDJSON line; raises ValueError describing what is wrong with it"""
+    try:
+        data = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("Each line must be a JSON object")
+
+    op = data.get('op')
+    if op not in BULK_OPERATIONS:
+        raise ValueError(f"'op' must be one of: {', '.join(sorted(BULK_OPERATIONS))}")
+    section_id = data.get('section_id')
+    if not isinstance(section_id, int) or isinstance(section_id, bool):
+        raise ValueError("'section_id' must be an integer")
+    url = data.get('url')
+    if not isinstance(url, str) or not url.strip():
+        raise ValueError("'url' is required")
+
+    if op == 'delete':
+        return LinkOperation(line_number, op, section_id, url.strip())
+
+    title, status, pinned = data.get('title'), data.get('status'), data.get('pinned')
+    if not isinstance(title, str) or not title.strip() or not isinstance(status, str) or not status.strip():
+        raise ValueError("'title' and 'status' are required for upsert")
+    if len(title.strip()) > TITLE_MAX_LENGTH or len(status.strip()) > STATUS_MAX_LENGTH:
+        raise ValueError(f"'title' is limited to {TITLE_MAX_LENGTH} and 'status' to {STATUS_MAX_LENGTH} characters")
+    if pinned is not None and not isinstance(pinned, bool):
+        raise ValueError("'pinned' must be true or false")
+    return LinkOperation(line_number, op, section_id, url.strip(), title.strip(), status.strip(), pinned)
+
+
+def iter_operation_batches(stream, batch_size: int) -> Iterator[Tuple[List[LinkOperation], List[Dict]]]:
+    """
+    Read NDJSON lines from ``stream`` as they arrive and yield
+    (operations, line errors) once ``batch_size`` lines have been read.
+
+    Blank lines are skipped; a line that does not parse becomes an error
+    entry for its batch instead of failing the request.
+    """
+    operations: List[LinkOperation] = []
+    errors: List[Dict] = []
+    lines_in_batch = 0
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            operations.append(parse_operation(line_number, line))
+        except ValueError as e:
+            errors.append({"line": line_number, "message": str(e)})
+        lines_in_batch += 1
+        if lines_in_batch >= batch_size:
+            yield operations, errors
+            operations, errors, lines_in_batch = [], [], 0
+
+    if lines_in_batch:
+        yield operations, errors
+
+
+class BulkLinkSync:
+    """
+    Applies batches of link operations for one user.
+
+    Each batch is one transaction: section ownership is checked with one
+    query (sections already seen are remembered), the batch's existing links
+    are loaded with one query on (sheet_id, link), and inserts, updates and
+    deletes are each sent as a single executemany statement.
+
+    An upsert updates the section's oldest link with that URL, or adds one;
+    a delete removes every link in the section with that URL. Within a batch
+    the last operation for a (section, url) wins.
+    """
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self._owned: Dict[int, bool] = {}
+
+    def apply(self, batch_number: int, operations: List[LinkOperation], errors: List[Dict]) -> Dict:
+        """Apply one batch and return its result entry; a failed batch is rolled back"""
+        result = {
+            "batch": batch_number,
+            "status": "success",
+            "inserted": 0,
+            "updated": 0,
+            "deleted": 0,
+            "errors": list(errors),
+        }
+
+        try:
+            self._load_ownership({operation.section_id for operation in operations})
+            final: Dict[Tuple[int, str], LinkOperation] = {}
+            for operation in operations:
+                if not self._owned[operation.section_id]:
+                    result["errors"].append({"line": operation.line, "message": "Section not found or access denied"})
+                    continue
+                final.pop(operation.key, None)
+                final[operation.key] = operation
+
+            if final:
+                result.update(self._write(list(final.values())))
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Bulk link batch {batch_number} for user {self.user_id} failed: {str(e)}", exc_info=True)
+            result.update(status="failed", inserted=0, updated=0, deleted=0, message="Database operation failed")
+
+        result["errors"].sort(key=lambda error: error["line"])
+        return result
+
+    def _load_ownership(self, section_ids: Set[int]):
+        unknown = section_ids - self._owned.keys()
+        if not unknown:
+            return
+        owned = set(db.session.execute(
+            select(Sheet.id)
+            .join(Spreadsheet, Spreadsheet.id == Sheet.spreadsheet_id)
+            .where(Sheet.id.in_(unknown), Spreadsheet.user_id == self.user_id)
+        ).scalars())
+        self._owned.update({section_id: section_id in owned for section_id in unknown})
+
+    def _write(self, operations: List[LinkOperation]) -> Dict[str, int]:
+        existing: Dict[Tuple[int, str], List[tuple]] = {}
+        for link_id, sheet_id, link, title, row_key in db.session.execute(
+                select(Link.id, Link.sheet_id, Link.link, Link.title, Link.row_key)
+                .where(tuple_(Link.sheet_id, Link.link).in_([operation.key for operation in operations]))
+                .order_by(Link.id)
+        ).tuples():
+            existing.setdefault((sheet_id, link), []).append((link_id, title, row_key))
+
+        inserts: List[Dict] = []
+        updates: List[Dict] = []
+        deletes: List[Tuple[int, str]] = []
+
+        for operation in operations:
+            rows = existing.get(operation.key, [])
+            if operation.op == 'delete':
+                if rows:
+                    deletes.append(operation.key)
+                continue
+
+            if not rows:
+                inserts.append({
+                    'sheet_id': operation.section_id,
+                    'title': operation.title,
+                    'link': operation.url,
+                    'status': operation.status,
+                    'pinned': bool(operation.pinned),
+                    'row_key': LinkKeys().key(row_hash(operation.title, operation.url)),
+                })
+                continue
+
+            link_id, title, row_key = rows[0]
+            if title != operation.title or row_key is None:
+                # Keys only collide with links sharing this title and URL, all loaded above
+                row_key = LinkKeys(key for _, _, key in rows[1:] if key).key(row_hash(operation.title, operation.url))
+            updates.append({
+                'link_id': link_id,
+                'new_title': operation.title,
+                'new_status': operation.status,
+                'new_row_key': row_key,
+                'new_pinned': operation.pinned,
+            })
+
+        deleted = 0
+        if deletes:
+            deleted = db.session.execute(
+                delete(Link.__table__).where(tuple_(Link.sheet_id, Link.link).in_(deletes))
+            ).rowcount
+        if updates:
+            self._update(updates)
+        if inserts:
+            db.session.execute(insert(Link.__table__), inserts)
+
+        return {"inserted": len(inserts), "updated": len(updates), "deleted": deleted}
+
+    @staticmethod
+    def _update(updates: List[Dict]):
+        # Updates that leave ``pinned`` alone are sent as a separate statement
+        for with_pinned in (False, True):
+            rows = [row for row in updates if (row['new_pinned'] is not None) == with_pinned]
+            if not rows:
+                continue
+            values = {'title': bindparam('new_title'), 'status': bindparam('new_status'),
+                      'row_key': bindparam('new_row_key')}
+            if with_pinned:
+                values['pinned'] = bindparam('new_pinned')
+            db.session.execute(
+                update(Link.__table__).where(Link.id == bindparam('link_id')).values(**values),
+                [{key: value for key, value in row.items() if with_pinned or key != 'new_pinned'} for row in rows]
+            )
+
+
+def sync_links(user_id: int, stream: Iterable[bytes], batch_size: Optional[int] = None) -> List[Dict]:
+    """Apply an NDJSON stream of link operations batch by batch and return the per-batch results"""
+    batch_size = batch_size or DEFAULT_BULK_BATCH_SIZE
+    sync = BulkLinkSync(user_id)
+    results = []
+    for batch_number, (operations, errors) in enumerate(iter_operation_batches(stream, batch_size), start=1):
+        results.append(sync.apply(batch_number, operations, errors))
+    return results
@@ -15,7 +15,27 @@ class Config:
 
     # File upload configuration
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')  # Default to 'uploads' directory
-    ALLOWED_EXTENSIONS = {'csv', 'xls', 'xlsx'}
+    ALLOWED_EXTENSIONS = {'csv', 'xls', 'xlsx', 'csv.gz', 'zip'}
+    CSV_CHUNK_SIZE = int(os.getenv('CSV_CHUNK_SIZE', 10000))  # Rows read and flushed per chunk for CSV uploads
+    EXCEL_CHUNK_SIZE = int(os.getenv('EXCEL_CHUNK_SIZE', 10000))  # Rows read and flushed per chunk for .xlsx uploads
+    INSERT_BATCH_SIZE = int(os.getenv('INSERT_BATCH_SIZE', 1000))  # Rows per INSERT batch / COPY buffer
+    BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 1000))  # Operations per transaction in /api/links/bulk
+    USE_POSTGRES_COPY = os.getenv('USE_POSTGRES_COPY', 'true').lower() == 'true'  # COPY FROM STDIN on PostgreSQL
+    INCREMENTAL_SYNC = os.getenv('INCREMENTAL_SYNC', 'true').lower() == 'true'  # Diff re-uploads instead of replacing
+    PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', 0))  # Processes parsing .xlsx sheets in parallel (0/1 = off)
+
+    # Background upload jobs
+    ASYNC_UPLOADS = os.getenv('ASYNC_UPLOADS', 'true').lower() == 'true'  # Run ingestion on the worker pool
+    UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', 2))  # Upload worker threads per process
+    UPLOADS_PER_USER = int(os.getenv('UPLOADS_PER_USER', 1))  # Concurrent ingestions per user
+    UPLOAD_QUEUE_LIMIT = int(os.getenv('UPLOAD_QUEUE_LIMIT', 20))  # Waiting jobs before uploads get a 429
+    UPLOAD_QUEUE_LIMIT_PER_USER = int(os.getenv('UPLOAD_QUEUE_LIMIT_PER_USER', 3))
+
+    # Upload progress storage: 'memory' (single process) or 'sqlite' (shared by all workers on a host)
+    PROGRESS_BACKEND = os.getenv('PROGRESS_BACKEND', 'sqlite')
+    PROGRESS_DB_PATH = os.getenv('PROGRESS_DB_PATH', os.path.join('instance', 'upload_progress.sqlite3'))
+    PROGRESS_TTL = int(os.getenv('PROGRESS_TTL', 300))  # Seconds finished uploads stay visible
+    PROGRESS_STREAM_TIMEOUT = int(os.getenv('PROGRESS_STREAM_TIMEOUT', 300))  # Max seconds per SSE connection
 
     # Session management configuration
     SESSION_TYPE = os.getenv('SESSION_TYPE', 'filesystem')  # Default to filesystem session
@@ -28,9 +48,18 @@ class Config:
 
     # Pagination settings
     ITEMS_PER_PAGE = int(os.getenv('ITEMS_PER_PAGE', 20))  # Default to 20 items per page
+    MAX_ITEMS_PER_PAGE = int(os.getenv('MAX_ITEMS_PER_PAGE', 1000))  # Largest 'limit' a paginated API accepts
+    SECTION_PAGE_SIZE = int(os.getenv('SECTION_PAGE_SIZE', 100))  # Links rendered, then fetched per scroll, on a section page
+    SEARCH_RESULTS = int(os.getenv('SEARCH_RESULTS', 20))  # Link search results returned when no 'limit' is given
+    MAX_SEARCH_RESULTS = int(os.getenv('MAX_SEARCH_RESULTS', 100))  # Largest 'limit' link search accepts
 
 
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 10MB limit
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024))  # Bytes per resumable upload chunk
+    CHUNKED_UPLOAD_TTL = int(os.getenv('CHUNKED_UPLOAD_TTL', 24 * 60 * 60))  # Idle seconds before an unfinished chunked upload is deleted
+    CHUNKED_UPLOADS_PER_USER = int(os.getenv('CHUNKED_UPLOADS_PER_USER', 3))  # Unfinished chunked uploads a user may have at once
+    MAX_DECOMPRESSED_SIZE = int(os.getenv('MAX_DECOMPRESSED_SIZE', 1024 * 1024 * 1024))  # Bytes a .csv.gz/.zip may expand to
+    MAX_ARCHIVE_ENTRIES = int(os.getenv('MAX_ARCHIVE_ENTRIES', 100))  # Entries allowed in an uploaded .zip
     WTF_CSRF_TIME_LIMIT = 3600  # 1 hour expiration
 
 
@@ -50,6 +79,8 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'  # Use SQLite for testing
     WTF_CSRF_ENABLED = False  # Disable CSRF for easier testing
     SESSION_TYPE = 'null'  # No session persistence during tests
+    ASYNC_UPLOADS = False  # Run upload jobs inline so tests see their results
+    PROGRESS_BACKEND = 'memory'
 
 
 class ProductionConfig(Config):
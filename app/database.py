@@ -1,3 +1,5 @@
+from typing import Iterator
+from sqlalchemy import Row
 from app.extensions import db
 
 def initialize_database(app):
@@ -8,4 +10,15 @@ def initialize_database(app):
 def clear_database(app):
     """Drop all tables (development only)"""
     with app.app_context():
-        db.drop_all()
\ No newline at end of file
+        db.drop_all()
+
+def stream_rows(statement, yield_per: int) -> Iterator[Row]:
+    """Execute ``statement`` on a connection of its own and yield its rows ``yield_per`` at a time
+
+    For streamed responses: the body is read after the request's session
+    has been torn down, which would end the transaction that a server-side
+    cursor (a named cursor on PostgreSQL) lives in. Nothing runs until the
+    first row is asked for.
+    """
+    with db.engine.connect() as connection:
+        yield from connection.execution_options(yield_per=yield_per).execute(statement)
@@ -0,0 +1,126 @@
+import io
+import csv
+import logging
+import tempfile
+from typing import Iterator, Optional
+from openpyxl import Workbook
+from sqlalchemy import select
+from app.database import stream_rows
+from app.models import Spreadsheet, Sheet, Link
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+EXPORT_HEADER = ['Spreadsheet', 'Section', 'Title', 'Link', 'Status', 'Pinned']
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_YIELD_PER = 2000
+
+# Excel limits sheet titles to 31 characters and forbids some punctuation
+SHEET_TITLE_MAX = 31
+SHEET_TITLE_INVALID = str.maketrans({char: '_' for char in '[]:*?/\\'})
+
+# Rows Excel can hold in one worksheet, header included
+XLSX_MAX_ROWS = 1048576
+XLSX_HEADER = ['Title', 'Link', 'Status', 'Pinned']
+
+
+def export_rows(user_id: int, spreadsheet_id: Optional[int] = None, sheet_id: Optional[int] = None):
+    """
+    Stream a user's links as (spreadsheet, section, title, link, status, pinned)
+    rows in spreadsheet, section and link order.
+
+    Rows come from a server-side cursor ``EXPORT_YIELD_PER`` at a time, so
+    the export never holds more than one batch in memory. The query runs on
+    its own connection when the response body is first read.
+    """
+    statement = (
+        select(Spreadsheet.name, Sheet.name, Link.title, Link.link, Link.status, Link.pinned)
+        .join(Sheet, Sheet.spreadsheet_id == Spreadsheet.id)
+        .join(Link, Link.sheet_id == Sheet.id)
+        .where(Spreadsheet.user_id == user_id)
+        .order_by(Spreadsheet.id, Sheet.id, Link.id)
+    )
+    if spreadsheet_id is not None:
+        statement = statement.where(Spreadsheet.id == spreadsheet_id)
+    if sheet_id is not None:
+        statement = statement.where(Sheet.id == sheet_id)
+    return stream_rows(statement, EXPORT_YIELD_PER)
+
+
+def iter_csv(rows) -> Iterator[bytes]:
+    """Encode rows as CSV, one yielded block per ``EXPORT_YIELD_PER`` rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens UTF-8 exports correctly
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_HEADER)
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_YIELD_PER == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+def iter_xlsx(rows, read_size: int = 64 * 1024, max_rows: int = XLSX_MAX_ROWS) -> Iterator[bytes]:
+    """
+    Write rows into an openpyxl write-only workbook, one worksheet per section,
+    then yield the saved file. A section longer than ``max_rows`` (Excel's
+    row limit) continues on further worksheets, "Section (2)" and so on.
+
+    Write-only worksheets spool their rows to temporary files, so memory stays
+    flat however many links are exported; the zip container can only be
+    sent once it has been assembled on disk.
+    """
+    workbook = Workbook(write_only=True)
+    used_titles = set()
+    worksheet = None
+    current_section = None
+    worksheet_rows = 0
+
+    for spreadsheet_name, section_name, title, link, status, pinned in rows:
+        if (spreadsheet_name, section_name) != current_section or worksheet_rows >= max_rows:
+            current_section = (spreadsheet_name, section_name)
+            worksheet = workbook.create_sheet(unique_sheet_title(section_name, used_titles))
+            worksheet.append(XLSX_HEADER)
+            worksheet_rows = 1
+        worksheet.append([title, link, status, bool(pinned)])
+        worksheet_rows += 1
+
+    if worksheet is None:
+        workbook.create_sheet('Links').append(XLSX_HEADER)
+
+    with tempfile.TemporaryFile() as handle:
+        workbook.save(handle)
+        handle.seek(0)
+        for data in iter(lambda: handle.read(read_size), b''):
+            yield data
+
+
+def unique_sheet_title(name: str, used_titles: set) -> str:
+    """A valid Excel sheet title for ``name`` that is not in ``used_titles``"""
+    base = (name or 'Sheet').translate(SHEET_TITLE_INVALID)[:SHEET_TITLE_MAX]
+    title = base
+    suffix = 2
+    while title.lower() in used_titles:
+        tail = f" ({suffix})"
+        title = base[:SHEET_TITLE_MAX - len(tail)] + tail
+        suffix += 1
+    used_titles.add(title.lower())
+    return title
+
+
+def export_stream(file_format: str, rows) -> Iterator[bytes]:
+    if file_format == 'csv':
+        return iter_csv(rows)
+    if file_format == 'xlsx':
+        return iter_xlsx(rows)
+    raise ValueError(f"Unsupported export format: {file_format}")
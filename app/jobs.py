@@ -0,0 +1,209 @@
+import os
+import shutil
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Optional
+from flask import Flask
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import db
+from app.progress import start_upload_progress, update_upload_progress
+from app.utils import process_uploaded_file
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class UploadRejected(Exception):
+    """Raised when an upload cannot be admitted now; ``retry_after`` is a suggested wait in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UploadJob:
+    def __init__(self, file_path: str, user_id: int, job_id: str, content_hash: Optional[str] = None):
+        self.file_path = file_path
+        self.user_id = user_id
+        self.job_id = job_id
+        self.content_hash = content_hash
+
+
+class UploadScheduler:
+    """
+    Admission control for upload jobs in this process.
+
+    At most UPLOAD_WORKERS ingestions run at once, and at most
+    UPLOADS_PER_USER of them for any one user. Jobs beyond that wait in a
+    FIFO queue, skipping past users who are at their limit, and report their
+    position in the progress store. Once UPLOAD_QUEUE_LIMIT jobs (or
+    UPLOAD_QUEUE_LIMIT_PER_USER for one user) are waiting, new uploads are
+    rejected with UploadRejected.
+    """
+
+    def __init__(self, app: Flask):
+        self.app = app
+        self.asynchronous = app.config.get('ASYNC_UPLOADS', True)
+        self.workers = max(1, app.config.get('UPLOAD_WORKERS', 2))
+        self.per_user = max(1, app.config.get('UPLOADS_PER_USER', 1))
+        self.queue_limit = app.config.get('UPLOAD_QUEUE_LIMIT', 20)
+        self.user_queue_limit = app.config.get('UPLOAD_QUEUE_LIMIT_PER_USER', 3)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='upload-worker')
+        self._lock = threading.Lock()
+        self._pending: Deque[UploadJob] = deque()
+        self._running: Dict[int, int] = {}
+        # Recent job durations, for Retry-After estimates
+        self._durations: Deque[float] = deque(maxlen=20)
+
+    def submit(self, job: UploadJob):
+        """Start ``job`` now or queue it; raises UploadRejected when over the limits"""
+        if not self.asynchronous:
+            self._run_inline(job)
+            return
+
+        with self._lock:
+            self._check_admission(job.user_id)
+            start_upload_progress(job.job_id, job.user_id, os.path.basename(job.file_path))
+            self._pending.append(job)
+            self._dispatch()
+
+    def check(self, user_id: int):
+        """Raise UploadRejected if an upload from ``user_id`` would be rejected right now"""
+        with self._lock:
+            self._check_admission(user_id)
+
+    @property
+    def running_count(self) -> int:
+        return sum(self._running.values())
+
+    def _can_start(self, user_id: int) -> bool:
+        return self.running_count < self.workers and self._running.get(user_id, 0) < self.per_user
+
+    def _check_admission(self, user_id: int):
+        if self._can_start(user_id) and not self._pending:
+            return
+        user_pending = sum(1 for job in self._pending if job.user_id == user_id)
+        if len(self._pending) >= self.queue_limit or user_pending >= self.user_queue_limit:
+            raise UploadRejected("Too many uploads in progress", self._retry_after())
+
+    def _retry_after(self) -> int:
+        average = sum(self._durations) / len(self._durations) if self._durations else 30.0
+        waves = len(self._pending) // self.workers + 1
+        return int(min(max(average * waves, 5), 600))
+
+    def _dispatch(self):
+        """Start queued jobs while there are free slots, then publish queue positions (lock held)"""
+        for job in list(self._pending):
+            if self.running_count >= self.workers:
+                break
+            if self._can_start(job.user_id):
+                self._pending.remove(job)
+                self._running[job.user_id] = self._running.get(job.user_id, 0) + 1
+                self._executor.submit(self._run, job)
+                logger.info(f"Upload job {job.job_id} started for user {job.user_id}")
+
+        for position, job in enumerate(self._pending, start=1):
+            update_upload_progress(job.job_id, {"status": "Queued", "queue_position": position})
+
+    def _release(self, job: UploadJob, duration: float):
+        self._durations.append(duration)
+        self._running[job.user_id] -= 1
+        if not self._running[job.user_id]:
+            del self._running[job.user_id]
+
+    def _run(self, job: UploadJob):
+        started = time.monotonic()
+        try:
+            run_upload_job(self.app, job.file_path, job.user_id, job.job_id, job.content_hash)
+        finally:
+            with self.app.app_context(), self._lock:
+                self._release(job, time.monotonic() - started)
+                self._dispatch()
+
+    def _run_inline(self, job: UploadJob):
+        """Synchronous mode: run in the calling request if a slot is free, otherwise reject"""
+        with self._lock:
+            if not self._can_start(job.user_id):
+                raise UploadRejected("Too many uploads in progress", self._retry_after())
+            self._running[job.user_id] = self._running.get(job.user_id, 0) + 1
+
+        started = time.monotonic()
+        try:
+            start_upload_progress(job.job_id, job.user_id, os.path.basename(job.file_path))
+            run_upload_job(self.app, job.file_path, job.user_id, job.job_id, job.content_hash)
+        finally:
+            with self._lock:
+                self._release(job, time.monotonic() - started)
+
+
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(app: Flask) -> UploadScheduler:
+    """Return the app's upload scheduler in this process, creating it on first use"""
+    with _scheduler_lock:
+        scheduler = app.extensions.get('upload_scheduler')
+        if scheduler is None:
+            scheduler = app.extensions['upload_scheduler'] = UploadScheduler(app)
+        return scheduler
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def job_upload_path(app: Flask, job_id: str, filename: str) -> str:
+    """Storage path for a job's file; each job gets its own directory so the file keeps its name"""
+    job_dir = os.path.join(app.config['UPLOAD_FOLDER'], job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    return os.path.join(job_dir, filename)
+
+
+def submit_upload(
+        app: Flask,
+        file_path: str,
+        user_id: int,
+        job_id: str,
+        content_hash: Optional[str] = None
+) -> str:
+    """
+    Queue ingestion of a saved upload and return its job id.
+
+    Raises UploadRejected when the process or the user has too many uploads
+    running and queued. With ASYNC_UPLOADS disabled the job runs before this
+    returns, which keeps tests and single-threaded tooling deterministic.
+    """
+    get_scheduler(app).submit(UploadJob(file_path, user_id, job_id, content_hash))
+    return job_id
+
+
+def run_upload_job(
+        app: Flask,
+        file_path: str,
+        user_id: int,
+        job_id: str,
+        content_hash: Optional[str] = None
+):
+    """Worker entry point: ingest the file inside an app context and clean up after it
+
+    process_uploaded_file records the outcome (result or error_code) along
+    with the job's final status.
+    """
+    with app.app_context():
+        try:
+            logger.info(f"Upload job {job_id} started: {file_path}")
+            result = process_uploaded_file(file_path, user_id, job_id=job_id, content_hash=content_hash)
+            logger.info(f"Upload job {job_id} finished with status: {result}")
+        except (ValueError, SQLAlchemyError):
+            # Already logged and recorded by process_uploaded_file
+            pass
+        except Exception as e:
+            logger.critical(f"Upload job {job_id} failed: {str(e)}", exc_info=True)
+        finally:
+            db.session.remove()
+            shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+            logger.debug(f"Upload job {job_id} files removed")
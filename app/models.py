@@ -43,6 +43,7 @@ class Spreadsheet(db.Model):
     name = db.Column(db.String(255), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    content_hash = db.Column(db.String(64))  # SHA-256 hex digest of the last ingested upload
 
     # Relationships
     owner = db.relationship('User', back_populates='spreadsheets')
@@ -50,6 +51,11 @@ class Spreadsheet(db.Model):
         'Sheet', back_populates='spreadsheet', cascade='all, delete-orphan', lazy=True
     )
 
+    # Spreadsheets are looked up by owner, and by owner and file name on re-upload
+    __table_args__ = (
+        db.Index('ix_spreadsheets_user_name', 'user_id', 'name'),
+    )
+
     def __repr__(self):
         return f'<Spreadsheet(name={self.name}, user_id={self.user_id})>'
 
@@ -70,6 +76,11 @@ class Sheet(db.Model):
         'Link', back_populates='sheet', cascade='all, delete-orphan', lazy=True
     )
 
+    __table_args__ = (
+        db.Index('ix_sheets_spreadsheet_id', 'spreadsheet_id'),
+        db.Index('ix_sheets_name', 'name'),
+    )
+
     def __repr__(self):
         return f'<Sheet(name={self.name}, spreadsheet_id={self.spreadsheet_id})>'
 
@@ -85,11 +96,19 @@ class Link(db.Model):
     title = db.Column(db.String(255), nullable=False)
     link = db.Column(db.Text, nullable=False)
     status = db.Column(db.String(100), nullable=False)
-    pinned = db.Column(db.Boolean, default=False, server_default='false')
+    pinned = db.Column(db.Boolean, nullable=False, default=False, server_default='false')
+    # Identifies the row within its sheet for upserts; see app.utils.LinkKeys
+    row_key = db.Column(db.String(40))
 
     # Relationship
     sheet = db.relationship('Sheet', back_populates='links')
 
+    __table_args__ = (
+        db.Index('uq_links_sheet_row_key', 'sheet_id', 'row_key', unique=True),
+        # Section pages: pinned links first, each group in id order (see app.pagination)
+        db.Index('ix_links_sheet_pinned_id', 'sheet_id', 'pinned', 'id'),
+    )
+
     def __repr__(self):
         return f'<Link(title={self.title}, url={self.link}, status={self.status})>'
 
@@ -0,0 +1,118 @@
+import json
+import base64
+import logging
+from typing import List, Optional, Tuple
+from sqlalchemy import func, select, tuple_
+from app.models import Spreadsheet, Sheet, Link, db
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Largest page a client may ask for (overridable via MAX_ITEMS_PER_PAGE)
+DEFAULT_MAX_ITEMS_PER_PAGE = 1000
+
+LINK_COLUMNS = (Link.id, Link.title, Link.link, Link.status, Link.pinned)
+
+
+class InvalidPageRequest(ValueError):
+    """A ``limit`` or ``after`` query parameter that cannot be used"""
+
+
+def encode_cursor(*values) -> str:
+    """Opaque, URL-safe token for the sort key of the last row on a page"""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str, size: int) -> tuple:
+    """Sort key from a cursor token; raises InvalidPageRequest if it was not made by encode_cursor"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidPageRequest("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidPageRequest("Invalid cursor")
+    return tuple(values)
+
+
+def page_limit(value: Optional[str], default: int, maximum: int) -> int:
+    """Page size from a ``limit`` parameter, ``default`` when absent"""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidPageRequest("'limit' must be an integer")
+    if not 1 <= limit <= maximum:
+        raise InvalidPageRequest(f"'limit' must be between 1 and {maximum}")
+    return limit
+
+
+def section_links_page(sheet_id: int, limit: int, after: Optional[str] = None) -> Tuple[List[tuple], Optional[str]]:
+    """
+    One page of a section's links, pinned links first, each group in id order,
+    and the cursor for the next page (None on the last page).
+
+    The cursor holds the (pinned, id) of the page's last link. Pinned and
+    unpinned links are read as two id ranges, each an index range scan that
+    starts at the cursor, so a page costs at most two bounded queries however
+    deep into the section it is.
+    """
+    pinned, last_id = decode_cursor(after, 2) if after else (True, 0)
+    if not isinstance(pinned, bool) or not isinstance(last_id, int):
+        raise InvalidPageRequest("Invalid cursor")
+
+    def fetch(pinned_group: bool, after_id: int, count: int) -> List[tuple]:
+        return db.session.execute(
+            select(*LINK_COLUMNS)
+            .where(Link.sheet_id == sheet_id, Link.pinned == pinned_group, Link.id > after_id)
+            .order_by(Link.id)
+            .limit(count)
+        ).all()
+
+    # One row beyond the page tells whether there is a next page
+    rows = fetch(pinned, last_id, limit + 1)
+    if pinned and len(rows) <= limit:
+        rows += fetch(False, 0, limit + 1 - len(rows))
+
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(bool(last.pinned), last.id)
+
+
+def sheet_sort_key():
+    """(spreadsheet id, sheet id) of a dashboard row; spreadsheets without sheets sort as sheet 0"""
+    return tuple_(Spreadsheet.id, func.coalesce(Sheet.id, 0))
+
+
+def dashboard_page_bounds(user_id: int, limit: int, after: Optional[str] = None) -> Tuple[Optional[tuple], Optional[tuple], Optional[str]]:
+    """
+    Key range of one page of ``limit`` sheets of the dashboard, in
+    (spreadsheet id, sheet id) order, as (after, until, next cursor).
+    ``until`` is None when the page is empty.
+
+    Only sheets are counted: every link of a sheet on the page is included,
+    however many it has. Clients that need a bounded number of links page
+    through a section with section_links_page (/api/sections/<id>/links).
+    """
+    lower = decode_cursor(after, 2) if after else None
+    if lower and not all(isinstance(value, int) for value in lower):
+        raise InvalidPageRequest("Invalid cursor")
+
+    statement = (
+        select(Spreadsheet.id, func.coalesce(Sheet.id, 0))
+        .select_from(Spreadsheet)
+        .outerjoin(Sheet, Sheet.spreadsheet_id == Spreadsheet.id)
+        .where(Spreadsheet.user_id == user_id)
+        .order_by(Spreadsheet.id, func.coalesce(Sheet.id, 0))
+        .limit(limit + 1)
+    )
+    if lower:
+        statement = statement.where(sheet_sort_key() > tuple_(*lower))
+    keys = [tuple(row) for row in db.session.execute(statement)]
+
+    if not keys:
+        return lower, None, None
+    until = keys[min(limit, len(keys)) - 1]
+    next_cursor = encode_cursor(*until) if len(keys) > limit else None
+    return lower, until, next_cursor
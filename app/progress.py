@@ -0,0 +1,418 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from flask import current_app
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Job statuses after which an entry only waits for clients to read it before eviction
+FINISHED_STATUSES = {'Completed', 'Failed'}
+
+# Unfinished entries not updated for this long belong to dead workers
+STALE_ENTRY_SECONDS = 6 * 60 * 60
+
+
+class ProgressStore(ABC):
+    """
+    Storage for upload job progress entries, keyed by job id.
+
+    Entries are plain dicts carrying at least ``job_id`` and ``user_id``.
+    Finished entries expire ``ttl`` seconds after they finish. Reads skip
+    expired entries; they are only deleted when a job starts (``set``) or
+    by ``evict_expired``, so progress polls never write.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        # Wakes watchers in this process as soon as an entry changes
+        self._changed = threading.Condition()
+
+    def wait_for_change(self, timeout: float):
+        """Block until an entry changes in this process or ``timeout`` seconds pass"""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    @abstractmethod
+    def set(self, job_id: str, entry: Dict):
+        """Store ``entry`` as the job's progress, replacing any previous one"""
+
+    @abstractmethod
+    def update(self, job_id: str, fields: Dict):
+        """Merge ``fields`` into the job's entry"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        """The job's entry, or None if unknown or expired"""
+
+    @abstractmethod
+    def latest_for_user(self, user_id: int) -> Optional[Dict]:
+        """The user's most recently updated entry, or None"""
+
+    @abstractmethod
+    def evict_expired(self):
+        """Drop finished entries older than ``ttl`` and stale unfinished ones"""
+
+    def _is_expired(self, updated_at: float, finished_at: Optional[float], now: float) -> bool:
+        if finished_at is not None:
+            return now - finished_at > self.ttl
+        return now - updated_at > STALE_ENTRY_SECONDS
+
+    @staticmethod
+    def _finished_at(entry: Dict, previous: Optional[float], now: float) -> Optional[float]:
+        if entry.get("status") in FINISHED_STATUSES:
+            return previous or now
+        return None
+
+
+class MemoryProgressStore(ProgressStore):
+    """Per-process store; only correct when a single process serves every request"""
+
+    def __init__(self, ttl: int):
+        super().__init__(ttl)
+        self._entries: Dict[str, Dict] = {}
+        self._times: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def set(self, job_id: str, entry: Dict):
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            self._entries[job_id] = dict(entry)
+            self._times[job_id] = (now, self._finished_at(entry, None, now))
+        self._notify()
+
+    def update(self, job_id: str, fields: Dict):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return
+            entry.update(fields)
+            self._times[job_id] = (now, self._finished_at(entry, self._times[job_id][1], now))
+        self._notify()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None or self._is_expired(*self._times[job_id], time.time()):
+                return None
+            return dict(entry)
+
+    def latest_for_user(self, user_id: int) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            user_jobs = [
+                entry for job_id, entry in self._entries.items()
+                if entry.get("user_id") == user_id and not self._is_expired(*self._times[job_id], now)
+            ]
+            latest = max(user_jobs, key=lambda entry: entry["started_at"], default=None)
+            return dict(latest) if latest else None
+
+    def evict_expired(self):
+        with self._lock:
+            self._evict(time.time())
+
+    def _evict(self, now: float):
+        expired = [
+            job_id for job_id, (updated_at, finished_at) in self._times.items()
+            if self._is_expired(updated_at, finished_at, now)
+        ]
+        for job_id in expired:
+            del self._entries[job_id]
+            del self._times[job_id]
+
+
+class SQLiteProgressStore(ProgressStore):
+    """
+    File-backed store shared by every worker process on the host.
+
+    Each call opens a short-lived connection; WAL mode lets progress polls
+    read while upload jobs write.
+    """
+
+    # Rows past their TTL, as in ProgressStore._is_expired; never NULL, so NOT works
+    EXPIRED = 'IFNULL(finished_at < ?, updated_at < ?)'
+
+    def __init__(self, ttl: int, path: str):
+        super().__init__(ttl)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS upload_progress ('
+                ' job_id TEXT PRIMARY KEY,'
+                ' user_id INTEGER NOT NULL,'
+                ' started_at TEXT NOT NULL,'
+                ' updated_at REAL NOT NULL,'
+                ' finished_at REAL,'
+                ' data TEXT NOT NULL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_upload_progress_user '
+                'ON upload_progress (user_id, started_at)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def set(self, job_id: str, entry: Dict):
+        now = time.time()
+        connection = self._connect()
+        try:
+            self._evict(connection, now)
+            connection.execute(
+                'INSERT OR REPLACE INTO upload_progress '
+                '(job_id, user_id, started_at, updated_at, finished_at, data) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, entry["user_id"], entry["started_at"], now,
+                 self._finished_at(entry, None, now), json.dumps(entry))
+            )
+        finally:
+            connection.close()
+        self._notify()
+
+    def update(self, job_id: str, fields: Dict):
+        now = time.time()
+        connection = self._connect()
+        try:
+            # Read-modify-write under a write lock so concurrent updates are not lost
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT data, finished_at FROM upload_progress WHERE job_id = ?', (job_id,)
+            ).fetchone()
+            if row is None:
+                connection.execute('ROLLBACK')
+                return
+            entry = json.loads(row[0])
+            entry.update(fields)
+            connection.execute(
+                'UPDATE upload_progress SET data = ?, updated_at = ?, finished_at = ? WHERE job_id = ?',
+                (json.dumps(entry), now, self._finished_at(entry, row[1], now), job_id)
+            )
+            connection.execute('COMMIT')
+        finally:
+            connection.close()
+        self._notify()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                f'SELECT data FROM upload_progress WHERE job_id = ? AND NOT {self.EXPIRED}',
+                (job_id, *self._expiry_bounds(time.time()))
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+        finally:
+            connection.close()
+
+    def latest_for_user(self, user_id: int) -> Optional[Dict]:
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                f'SELECT data FROM upload_progress WHERE user_id = ? AND NOT {self.EXPIRED} '
+                'ORDER BY started_at DESC LIMIT 1',
+                (user_id, *self._expiry_bounds(time.time()))
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+        finally:
+            connection.close()
+
+    def evict_expired(self):
+        connection = self._connect()
+        try:
+            self._evict(connection, time.time())
+        finally:
+            connection.close()
+
+    def _expiry_bounds(self, now: float) -> tuple:
+        """Parameters of EXPIRED: oldest live finish time, oldest live update of an unfinished job"""
+        return now - self.ttl, now - STALE_ENTRY_SECONDS
+
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        connection.execute(f'DELETE FROM upload_progress WHERE {self.EXPIRED}', self._expiry_bounds(now))
+
+
+# One store per backend configuration, shared by all threads of the process
+_stores: Dict[tuple, ProgressStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_progress_store() -> ProgressStore:
+    """Return the progress store selected by PROGRESS_BACKEND for the current app"""
+    backend = current_app.config.get('PROGRESS_BACKEND', 'memory')
+    ttl = current_app.config.get('PROGRESS_TTL', 300)
+    path = current_app.config.get('PROGRESS_DB_PATH', 'progress.sqlite3')
+    key = (backend, ttl, path if backend == 'sqlite' else None)
+
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if backend == 'sqlite':
+                store = SQLiteProgressStore(ttl, path)
+            elif backend == 'memory':
+                store = MemoryProgressStore(ttl)
+            else:
+                raise ValueError(f"Unknown PROGRESS_BACKEND: {backend}")
+            logger.info(f"Using {backend} upload progress store")
+            _stores[key] = store
+        return store
+
+
+def start_upload_progress(job_id: str, user_id: int, filename: str):
+    """Create (or reset) the progress entry for an upload job"""
+    get_progress_store().set(job_id, {
+        "job_id": job_id,
+        "user_id": user_id,
+        "filename": filename,
+        "status": "Queued",
+        "progress": 0,
+        "current_sheet": "",
+        "started_at": datetime.utcnow().isoformat()
+    })
+
+
+def update_upload_progress(job_id: str, fields: Dict):
+    """Merge ``fields`` into a job's progress entry"""
+    get_progress_store().update(job_id, fields)
+
+
+def get_upload_progress(user_id: int, job_id: Optional[str] = None) -> Optional[Dict]:
+    """Return a user's progress entry for ``job_id``, or their most recent job when no id is given"""
+    store = get_progress_store()
+    if job_id:
+        entry = store.get(job_id)
+        return entry if entry and entry.get("user_id") == user_id else None
+    return store.latest_for_user(user_id)
+
+
+def watch_upload_progress(
+        user_id: int,
+        job_id: str,
+        timeout: float,
+        poll_interval: float = 0.5,
+        keepalive: float = 15.0
+) -> Iterator[Optional[Dict]]:
+    """
+    Yield a user's job entry each time it changes, until the job finishes,
+    disappears or ``timeout`` seconds pass.
+
+    Updates made in this process wake the watcher immediately; updates from
+    other worker processes are picked up every ``poll_interval`` seconds.
+    ``None`` is yielded after ``keepalive`` quiet seconds so callers can keep
+    the connection open.
+    """
+    store = get_progress_store()
+    deadline = time.monotonic() + timeout
+    last_sent = time.monotonic()
+    previous = None
+
+    while time.monotonic() < deadline:
+        entry = get_upload_progress(user_id, job_id)
+        if entry is None:
+            return
+        if entry != previous:
+            previous = entry
+            last_sent = time.monotonic()
+            yield entry
+            if entry.get("status") in FINISHED_STATUSES:
+                return
+        elif time.monotonic() - last_sent >= keepalive:
+            last_sent = time.monotonic()
+            yield None
+        store.wait_for_change(poll_interval)
+
+
+class IngestMetrics:
+    """
+    Row counts, throughput and per-phase timings for one upload.
+
+    Phases (read, validate, clean, insert, commit, ...) are timed with
+    ``phase()``. Chunks iterated through ``track_chunks()`` count as read and
+    trigger ``on_update`` once each has been processed, which is how upload
+    jobs publish live metrics to the progress store.
+    """
+
+    def __init__(self, total_bytes: int = 0, on_update: Optional[Callable[['IngestMetrics'], None]] = None):
+        self.total_bytes = total_bytes
+        self.bytes_processed = 0
+        self.rows_read = 0
+        self.rows_written = 0
+        # Total data rows, when every sheet's size is known up front
+        self.expected_rows: Optional[int] = None
+        self.phase_seconds: Dict[str, float] = {}
+        self._on_update = on_update
+        self._started = time.monotonic()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + time.monotonic() - started
+
+    def track_chunks(self, chunks: Iterable) -> Iterator:
+        """Time reads from ``chunks`` and publish metrics after each chunk is processed"""
+        iterator = iter(chunks)
+        while True:
+            with self.phase('read'):
+                chunk = next(iterator, None)
+            if chunk is None:
+                return
+            self.rows_read += len(chunk)
+            yield chunk
+            if self._on_update:
+                self._on_update(self)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    def fraction_done(self) -> Optional[float]:
+        """Share of the input processed, by rows when the total is known, else by bytes"""
+        if self.expected_rows:
+            return min(self.rows_read / self.expected_rows, 1.0)
+        if self.total_bytes and self.bytes_processed:
+            return min(self.bytes_processed / self.total_bytes, 1.0)
+        return None
+
+    def snapshot(self) -> Dict:
+        elapsed = self.elapsed
+        fraction = self.fraction_done()
+        eta = None
+        if fraction:
+            eta = round(elapsed * (1 - fraction) / fraction, 1)
+        return {
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+            "rows_per_sec": round(self.rows_read / elapsed, 1) if elapsed else 0.0,
+            "bytes_processed": self.bytes_processed,
+            "total_bytes": self.total_bytes,
+            "elapsed_seconds": round(elapsed, 2),
+            "eta_seconds": eta,
+            "phase_seconds": {name: round(seconds, 3) for name, seconds in self.phase_seconds.items()},
+        }
+
+    def summary(self) -> str:
+        """One key=value line for the upload log"""
+        stats = self.snapshot()
+        phases = " ".join(f"{name}={seconds:.2f}s" for name, seconds in stats["phase_seconds"].items())
+        return (
+            f"rows_read={stats['rows_read']} rows_written={stats['rows_written']} "
+            f"rows_per_sec={stats['rows_per_sec']} bytes={stats['bytes_processed']} "
+            f"total={stats['elapsed_seconds']}s {phases}"
+        )
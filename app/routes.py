@@ -1,8 +1,15 @@
 import os
+import json
+import shutil
 import logging
+import time
 import uuid
-from flask import Blueprint, render_template, request, flash, current_app, jsonify, redirect, url_for
+from flask import (
+    Blueprint, Response, render_template, request, flash, current_app, jsonify, redirect, stream_with_context,
+    url_for
+)
 from flask_login import login_required, current_user
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
@@ -10,10 +17,21 @@ from sqlalchemy.orm import joinedload
 from datetime import datetime
 from flask_wtf.csrf import validate_csrf, CSRFError
 from app.models import Spreadsheet, Sheet, Link, db, get_quick_stats
-from .utils import allowed_file, process_uploaded_file
-from .utils import UPLOAD_PROGRESS
+from .utils import (
+    DecompressionLimitExceeded, allowed_file, file_extension, file_sha256, find_unchanged_spreadsheet,
+    next_row_key, validate_file_headers
+)
+from .progress import get_upload_progress, watch_upload_progress
+from .jobs import UploadRejected, get_scheduler, submit_upload
+from .exports import EXPORT_FORMATS, export_rows, export_stream
+from .pagination import section_links_page
+from .search import find_links
+from .uploads import (
+    DEFAULT_CHUNKED_UPLOAD_TTL, DEFAULT_CHUNKED_UPLOADS_PER_USER, UploadSpool, cancel_chunked_upload,
+    chunked_upload_status, content_matches_extension, create_chunked_upload, finish_chunked_upload,
+    load_chunked_upload, read_head, sweep_chunked_uploads, write_chunk
+)
 from flask import send_from_directory
-from sqlalchemy import or_
 
 # Configure detailed logging
 logging.basicConfig(
@@ -91,11 +109,53 @@ def dashboard():
         return redirect(url_for('auth.login'))
 
 
+def upload_rejected_response(error: UploadRejected):
+    """429 for an upload refused by admission control"""
+    logger.warning(f"Upload rejected for user {current_user.id}: {error}; retry after {error.retry_after}s")
+    response = jsonify({
+        "status": "error",
+        "message": f"{error}, please retry later",
+        "error_code": "TOO_MANY_UPLOADS",
+        "retry_after": error.retry_after
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+
+def header_validation_error(file_path: str):
+    """Reject a stored upload from its sheets' header rows alone; returns an error response or None"""
+    try:
+        errors = validate_file_headers(file_path)
+    except DecompressionLimitExceeded as e:
+        logger.error(f"Compressed upload {file_path} rejected: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": str(e),
+            "error_code": "DECOMPRESSED_TOO_LARGE"
+        }), 413
+    except Exception as e:
+        logger.error(f"Could not read headers of {file_path}: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": "Invalid file content",
+            "error_code": "INVALID_FILE_CONTENT"
+        }), 400
+
+    if errors:
+        logger.warning("Validation errors:\n" + "\n".join(errors))
+        return jsonify({
+            "status": "error",
+            "message": "File validation failed",
+            "details": "\n".join(errors),
+            "error_code": "VALIDATION_FAILURE"
+        }), 400
+    return None
+
+
 @main_bp.route('/upload', methods=['POST'])
 @login_required
 def upload_file():
-    """File upload handler with detailed transaction logging"""
-    file_path = None
+    """File upload handler: stores the file and queues a background ingestion job"""
     try:
         # Validate CSRF token
         validate_csrf(request.form.get('csrf_token'))
@@ -121,27 +181,16 @@ def upload_file():
                 "error_code": "EMPTY_FILE"
             }), 400
 
-        # File size validation
-        try:
-            file.seek(0, os.SEEK_END)
-            file_length = file.tell()
-            file.seek(0)
-            logger.debug(f"File '{file.filename}' size: {file_length} bytes")
-
-            if file_length > current_app.config['MAX_CONTENT_LENGTH']:
-                logger.error(f"File size {file_length} exceeds limit {current_app.config['MAX_CONTENT_LENGTH']}")
-                return jsonify({
-                    "status": "error",
-                    "message": "File size exceeds limit",
-                    "error_code": "FILE_TOO_LARGE"
-                }), 413
-        except OSError as e:
-            logger.error(f"File size check failed: {str(e)}")
-            return jsonify({
-                "status": "error",
-                "message": "Invalid file content",
-                "error_code": "INVALID_FILE_CONTENT"
-            }), 400
+        # The body was spooled to job storage by UploadRequest while it was received,
+        # with its size limit enforced, hash computed and leading bytes kept
+        spool = file.stream
+        if not isinstance(spool, UploadSpool):
+            raise RuntimeError("Upload was not received through UploadRequest")
+        spool.close()
+        file_path = spool.path
+        filename = os.path.basename(file_path)
+        content_hash = spool.hexdigest
+        logger.info(f"File '{file.filename}' received: {spool.size} bytes (sha256 {content_hash})")
 
         # File type validation
         if not allowed_file(file.filename):
@@ -152,26 +201,18 @@ def upload_file():
                 "error_code": "INVALID_FILE_TYPE"
             }), 400
 
-        # Secure file storage
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_folder, exist_ok=True)
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(upload_folder, filename)
-        logger.debug(f"Saving file to temporary location: {file_path}")
-
-        try:
-            file.save(file_path)
-            if not os.path.exists(file_path):
-                logger.critical("File save verification failed - file not found")
-                raise RuntimeError("File save verification failed")
-            logger.info("File saved successfully to temporary storage")
-        except Exception as e:
-            logger.error(f"File save failed: {str(e)}")
+        if not spool.matches_extension(file_extension(file.filename)):
+            logger.error(f"File content does not match its extension: {file.filename}")
             return jsonify({
                 "status": "error",
-                "message": "Failed to store file",
-                "error_code": "FILE_STORAGE_FAILURE"
-            }), 500
+                "message": "Invalid file content",
+                "error_code": "INVALID_FILE_CONTENT"
+            }), 400
+
+        # Structurally invalid files are rejected before any rows are parsed
+        validation_error = header_validation_error(file_path)
+        if validation_error:
+            return validation_error
 
         # Database health check
         try:
@@ -185,74 +226,232 @@ def upload_file():
                 "error_code": "DB_CONNECTION_FAILURE"
             }), 503
 
-        # Transaction management
-        try:
-            logger.info("Starting database transaction")
-            db.session.begin_nested()
-
-            # Remove existing entries
-            deleted_count = Spreadsheet.query.filter_by(
-                user_id=current_user.id,
-                name=filename
-            ).delete(synchronize_session=False)
-            logger.info(f"Deleted {deleted_count} existing spreadsheet entries")
-
-            # Process file
-            logger.debug(f"Processing file: {file_path}")
-            status = process_uploaded_file(file_path, current_user.id)
-            logger.info(f"File processing completed with status: {status}")
-
-            # Commit transaction
-            db.session.commit()
-            logger.info("Database transaction committed successfully")
-            db.session.expire_all()
-
-            # Verify database update
-            new_spreadsheet = Spreadsheet.query.filter_by(
-                user_id=current_user.id,
-                name=filename
-            ).first()
+        # Byte-identical re-uploads need no parsing or writes at all
+        unchanged = find_unchanged_spreadsheet(current_user.id, filename, content_hash)
+        if unchanged:
+            logger.info(f"Upload of '{filename}' matches spreadsheet {unchanged.id}; nothing to do")
+            return jsonify({
+                "status": "unchanged",
+                "message": "File is identical to the existing upload",
+                "filename": filename,
+                "redirect": url_for('main.dashboard')
+            }), 200
+
+        # Hand the file to the worker pool; it owns the file from here on
+        job_id = spool.job_id
+        submit_upload(current_app._get_current_object(), file_path, current_user.id, job_id, content_hash)
+        spool.queued = True
 
-            if not new_spreadsheet:
-                logger.critical("DATABASE UPDATE VERIFICATION FAILED: Spreadsheet not found after upload")
-                raise RuntimeError("Spreadsheet creation verification failed")
+        return jsonify({
+            "status": "accepted",
+            "message": "File queued for processing",
+            "filename": filename,
+            "job_id": job_id,
+            "progress_url": url_for('main.upload_progress', job_id=job_id),
+            "events_url": url_for('main.upload_progress_stream', job_id=job_id),
+            "redirect": url_for('main.dashboard')
+        }), 202
+
+    except UploadRejected as e:
+        return upload_rejected_response(e)
+
+    except RequestEntityTooLarge:
+        logger.error(f"Upload exceeds limit {current_app.config['MAX_CONTENT_LENGTH']}")
+        return jsonify({
+            "status": "error",
+            "message": "File size exceeds limit",
+            "error_code": "FILE_TOO_LARGE"
+        }), 413
 
-            logger.info(f"Spreadsheet created successfully. ID: {new_spreadsheet.id}")
+    except Exception as e:
+        logger.critical(f"UPLOAD PROCESS FAILURE: {str(e)}", exc_info=True)
+        return jsonify({
+            "status": "error",
+            "message": "System error during upload",
+            "error_code": "SYSTEM_FAILURE",
+            "reference_id": str(uuid.uuid4())
+        }), 500
+
+
+@main_bp.route('/upload/chunked', methods=['POST'])
+@login_required
+def start_chunked_upload():
+    """Initiate a resumable upload; the client then PUTs numbered chunks and completes it"""
+    try:
+        data = request.get_json(silent=True) or {}
+        filename = data.get('filename', '')
+        size = data.get('size')
 
+        if not filename or not isinstance(size, int) or size <= 0:
             return jsonify({
-                "status": "success",
-                "message": "File processed successfully",
-                "filename": filename,
-                "redirect": url_for('main.dashboard'),
-                "stats": get_quick_stats(current_user.id)
-            }), 200
+                "status": "error",
+                "message": "Missing required fields",
+                "error_code": "INVALID_UPLOAD_REQUEST"
+            }), 400
 
-        except ValueError as ve:
-            db.session.rollback()
-            logger.error(f"Validation error: {str(ve)}")
+        if not allowed_file(filename):
+            logger.error(f"Invalid file type: {filename}")
             return jsonify({
                 "status": "error",
-                "message": "File validation failed",
-                "details": str(ve),
-                "error_code": "VALIDATION_FAILURE"
+                "message": "Invalid file format",
+                "error_code": "INVALID_FILE_TYPE"
             }), 400
 
-        except SQLAlchemyError as sae:
-            db.session.rollback()
-            logger.critical(f"Database error: {str(sae)}", exc_info=True)
+        if size > current_app.config['MAX_CONTENT_LENGTH']:
+            logger.error(f"Chunked upload size {size} exceeds limit {current_app.config['MAX_CONTENT_LENGTH']}")
             return jsonify({
                 "status": "error",
-                "message": "Database operation failed",
-                "error_code": "DB_SAVE_FAILURE"
-            }), 500
+                "message": "File size exceeds limit",
+                "error_code": "FILE_TOO_LARGE"
+            }), 413
+
+        # Refuse before any bytes are sent if the upload could not be queued anyway
+        get_scheduler(current_app._get_current_object()).check(current_user.id)
+
+        # Abandoned uploads expire, and each user may only have a few unfinished ones
+        ttl = current_app.config.get('CHUNKED_UPLOAD_TTL', DEFAULT_CHUNKED_UPLOAD_TTL)
+        unfinished = sweep_chunked_uploads(ttl).get(current_user.id, [])
+        if len(unfinished) >= current_app.config.get('CHUNKED_UPLOADS_PER_USER', DEFAULT_CHUNKED_UPLOADS_PER_USER):
+            logger.warning(f"User {current_user.id} has {len(unfinished)} unfinished chunked uploads")
+            raise UploadRejected(
+                "Too many unfinished chunked uploads",
+                max(1, int(min(unfinished) + ttl - time.time()))
+            )
 
-        except Exception as e:
-            db.session.rollback()
-            logger.critical(f"Processing error: {str(e)}", exc_info=True)
-            raise
+        chunk_size = current_app.config['UPLOAD_CHUNK_SIZE']
+        manifest = create_chunked_upload(current_user.id, filename, size, chunk_size)
+        return jsonify({"status": "success", **chunked_upload_status(manifest)}), 201
 
+    except UploadRejected as e:
+        return upload_rejected_response(e)
     except Exception as e:
-        logger.critical(f"UPLOAD PROCESS FAILURE: {str(e)}", exc_info=True)
+        logger.error(f"Chunked upload initiation failed: {str(e)}", exc_info=True)
+        return jsonify({
+            "status": "error",
+            "message": "System error during upload",
+            "error_code": "SYSTEM_FAILURE"
+        }), 500
+
+
+@main_bp.route('/upload/chunked/<upload_id>', methods=['GET'])
+@login_required
+def chunked_upload_state(upload_id):
+    """Report which chunks of a resumable upload have been received"""
+    manifest = load_chunked_upload(upload_id, current_user.id)
+    if not manifest:
+        return jsonify({"status": "error", "message": "Upload not found"}), 404
+    return jsonify({"status": "success", **chunked_upload_status(manifest)}), 200
+
+
+@main_bp.route('/upload/chunked/<upload_id>', methods=['DELETE'])
+@login_required
+def delete_chunked_upload(upload_id):
+    """Abandon an unfinished resumable upload, freeing its slot and storage"""
+    manifest = load_chunked_upload(upload_id, current_user.id)
+    if not manifest:
+        return jsonify({"status": "error", "message": "Upload not found"}), 404
+    cancel_chunked_upload(manifest)
+    return jsonify({"status": "success", "upload_id": upload_id}), 200
+
+
+@main_bp.route('/upload/chunked/<upload_id>/<int:index>', methods=['PUT'])
+@login_required
+def put_upload_chunk(upload_id, index):
+    """Store one chunk of a resumable upload; resending a chunk overwrites it"""
+    try:
+        manifest = load_chunked_upload(upload_id, current_user.id)
+        if not manifest:
+            return jsonify({"status": "error", "message": "Upload not found"}), 404
+
+        write_chunk(manifest, index, request.stream)
+        logger.debug(f"Chunk {index}/{manifest['total_chunks']} stored for upload {upload_id}")
+        return jsonify({"status": "success", "index": index}), 200
+
+    except ValueError as ve:
+        logger.warning(f"Rejected chunk for upload {upload_id}: {str(ve)}")
+        return jsonify({
+            "status": "error",
+            "message": str(ve),
+            "error_code": "INVALID_CHUNK"
+        }), 400
+    except Exception as e:
+        logger.error(f"Chunk upload failed: {str(e)}", exc_info=True)
+        return jsonify({
+            "status": "error",
+            "message": "Failed to store chunk",
+            "error_code": "FILE_STORAGE_FAILURE"
+        }), 500
+
+
+@main_bp.route('/upload/chunked/<upload_id>/complete', methods=['POST'])
+@login_required
+def complete_chunked_upload(upload_id):
+    """Assemble a fully received upload and queue it for ingestion"""
+    try:
+        manifest = load_chunked_upload(upload_id, current_user.id)
+        if not manifest:
+            return jsonify({"status": "error", "message": "Upload not found"}), 404
+
+        state = chunked_upload_status(manifest)
+        if state["missing"]:
+            return jsonify({
+                "status": "error",
+                "message": "Upload is incomplete",
+                "error_code": "MISSING_CHUNKS",
+                "missing": state["missing"]
+            }), 409
+
+        get_scheduler(current_app._get_current_object()).check(current_user.id)
+
+        file_path = finish_chunked_upload(manifest)
+        filename = manifest["filename"]
+
+        if not content_matches_extension(read_head(file_path), file_extension(filename)):
+            shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+            logger.error(f"File content does not match its extension: {filename}")
+            return jsonify({
+                "status": "error",
+                "message": "Invalid file content",
+                "error_code": "INVALID_FILE_CONTENT"
+            }), 400
+
+        validation_error = header_validation_error(file_path)
+        if validation_error:
+            shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+            return validation_error
+
+        content_hash = file_sha256(file_path)
+        unchanged = find_unchanged_spreadsheet(current_user.id, filename, content_hash)
+        if unchanged:
+            shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+            logger.info(f"Upload of '{filename}' matches spreadsheet {unchanged.id}; nothing to do")
+            return jsonify({
+                "status": "unchanged",
+                "message": "File is identical to the existing upload",
+                "filename": filename,
+                "redirect": url_for('main.dashboard')
+            }), 200
+
+        try:
+            submit_upload(current_app._get_current_object(), file_path, current_user.id, upload_id, content_hash)
+        except UploadRejected:
+            # Lost a race for the last queue slot; the assembled file cannot be completed again
+            shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+            raise
+        return jsonify({
+            "status": "accepted",
+            "message": "File queued for processing",
+            "filename": filename,
+            "job_id": upload_id,
+            "progress_url": url_for('main.upload_progress', job_id=upload_id),
+            "events_url": url_for('main.upload_progress_stream', job_id=upload_id),
+            "redirect": url_for('main.dashboard')
+        }), 202
+
+    except UploadRejected as e:
+        return upload_rejected_response(e)
+    except Exception as e:
+        logger.critical(f"Chunked upload completion failed: {str(e)}", exc_info=True)
         return jsonify({
             "status": "error",
             "message": "System error during upload",
@@ -260,28 +459,31 @@ def upload_file():
             "reference_id": str(uuid.uuid4())
         }), 500
 
-    finally:
-        # Cleanup temporary file
-        if file_path and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                logger.debug(f"Temporary file removed: {file_path}")
-            except Exception as e:
-                logger.error(f"Cleanup error: {str(e)}")
-
 
 @main_bp.route('/upload/progress', methods=['GET'])
 @login_required
 def upload_progress():
-    """Upload progress tracker with detailed logging"""
+    """Upload progress tracker with detailed logging
+
+    Reports the job given by ``job_id``, or the user's most recent upload job.
+    """
     try:
-        logger.debug(f"Upload progress requested for user: {current_user.id}")
-        progress_data = UPLOAD_PROGRESS.get(current_user.id, {
-            "progress": 0,
-            "status": "Not started",
-            "current_sheet": "",
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        job_id = request.args.get('job_id')
+        logger.debug(f"Upload progress requested for user: {current_user.id}, job: {job_id}")
+        progress_data = get_upload_progress(current_user.id, job_id)
+        if progress_data is None:
+            if job_id:
+                return jsonify({
+                    "progress": 0,
+                    "status": "Unknown job",
+                    "job_id": job_id
+                }), 404
+            progress_data = {
+                "progress": 0,
+                "status": "Not started",
+                "current_sheet": "",
+                "timestamp": datetime.utcnow().isoformat()
+            }
         logger.debug(f"Returning progress data: {progress_data}")
         return jsonify(progress_data), 200
     except Exception as e:
@@ -293,6 +495,47 @@ def upload_progress():
         }), 500
 
 
+@main_bp.route('/upload/progress/stream', methods=['GET'])
+@login_required
+def upload_progress_stream():
+    """Server-Sent Events stream of an upload job's progress
+
+    Sends a ``progress`` event whenever the job's entry changes and closes
+    once it completes or fails. Clients reconnect after
+    PROGRESS_STREAM_TIMEOUT or fall back to polling /upload/progress.
+    """
+    job_id = request.args.get('job_id')
+    user_id = current_user.id
+    if not job_id or get_upload_progress(user_id, job_id) is None:
+        return jsonify({
+            "status": "error",
+            "message": "Unknown job",
+            "error_code": "UNKNOWN_JOB"
+        }), 404
+
+    # The stream can stay open for minutes; don't hold a pooled connection for it
+    db.session.close()
+    timeout = current_app.config.get('PROGRESS_STREAM_TIMEOUT', 300)
+    logger.debug(f"Streaming upload progress for user: {user_id}, job: {job_id}")
+
+    def events():
+        yield 'retry: 2000\n\n'
+        for entry in watch_upload_progress(user_id, job_id, timeout):
+            if entry is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield f'event: progress\ndata: {json.dumps(entry, default=str)}\n\n'
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Stop nginx from buffering the stream
+        }
+    )
+
+
 @main_bp.route('/dashboard/<section_name>')
 @login_required
 def dashboard_section(section_name):
@@ -300,14 +543,13 @@ def dashboard_section(section_name):
     try:
         logger.info(f"Loading section: {section_name} for user: {current_user.id}")
 
-        # Get current section with user validation
+        # Get current section with user validation; its links are paged, not loaded here
         current_section = Sheet.query \
             .join(Spreadsheet) \
             .filter(
             Sheet.name == section_name,
             Spreadsheet.user_id == current_user.id
         ) \
-            .options(joinedload(Sheet.links)) \
             .first()
 
         if not current_section:
@@ -330,20 +572,18 @@ def dashboard_section(section_name):
         ]
         logger.debug(f"Found {len(sections)} sections for navigation")
 
-        # Prepare links data - order by pinned status first, then by id
-        links = sorted(
-            current_section.links,
-            key=lambda x: (not x.pinned, x.id)
-        )
-        logger.info(f"Section contains {len(links)} links")
+        # Only the first page is rendered, ordered by the database: pinned first, then by id.
+        # The page fetches the rest from the section links API as it is scrolled.
+        page_size = current_app.config.get('SECTION_PAGE_SIZE', 100)
+        links, next_cursor = section_links_page(current_section.id, page_size)
+        logger.info(f"Rendering {len(links)} links of section {current_section.id}")
         data = [{
-            'id': link.id,
-            'title': link.title,
-            'url': link.link,
-            'status': link.status or 'unknown',
-            'pinned': link.pinned,
-            'description': link.description if hasattr(link, 'description') else None
-        } for link in links]
+            'id': link_id,
+            'title': title,
+            'url': url,
+            'status': status or 'unknown',
+            'pinned': bool(pinned),
+        } for link_id, title, url, status, pinned in links]
 
         # Calculate stats
         last_upload = max(
@@ -357,6 +597,8 @@ def dashboard_section(section_name):
             current_section=current_section,
             sections=sections,
             data=data,
+            next_cursor=next_cursor,
+            page_size=page_size,
             total_files=len(user_spreadsheets),
             total_sections=len(sections),
             last_upload=last_upload
@@ -393,7 +635,8 @@ def add_link():
             sheet_id=data['section_id'],
             title=data['title'],
             link=data['url'],
-            status=data['status']
+            status=data['status'],
+            row_key=next_row_key(data['section_id'], str(data['title']), str(data['url']))
         )
         db.session.add(new_link)
         db.session.commit()
@@ -758,10 +1001,57 @@ def download_template():
     )
 
 
+@main_bp.route('/export/<file_format>', methods=['GET'])
+@login_required
+def export_links(file_format):
+    """Stream the user's links as CSV or XLSX
+
+    Exports one section (``section_id``), one spreadsheet
+    (``spreadsheet_id``) or, with neither, everything the user owns.
+    """
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({
+            "status": "error",
+            "message": "Unsupported export format",
+            "error_code": "INVALID_EXPORT_FORMAT"
+        }), 404
+
+    section_id = request.args.get('section_id', type=int)
+    spreadsheet_id = request.args.get('spreadsheet_id', type=int)
+    export_name = 'links'
+
+    if section_id is not None:
+        section = Sheet.query.join(Spreadsheet).filter(
+            Sheet.id == section_id,
+            Spreadsheet.user_id == current_user.id
+        ).first()
+        if not section:
+            return jsonify({"status": "error", "message": "Section not found"}), 404
+        export_name = section.name
+    elif spreadsheet_id is not None:
+        spreadsheet = Spreadsheet.query.filter_by(id=spreadsheet_id, user_id=current_user.id).first()
+        if not spreadsheet:
+            return jsonify({"status": "error", "message": "Spreadsheet not found"}), 404
+        export_name = os.path.splitext(spreadsheet.name)[0]
+
+    logger.info(f"Exporting {export_name} as {file_format} for user: {current_user.id}")
+    rows = export_rows(current_user.id, spreadsheet_id=spreadsheet_id, sheet_id=section_id)
+    filename = f"{secure_filename(export_name) or 'links'}.{file_format}"
+
+    return Response(
+        stream_with_context(export_stream(file_format, rows)),
+        mimetype=EXPORT_FORMATS[file_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
 @main_bp.route('/search_links', methods=['GET'])
 @login_required
 def search_links():
-    """Search links by title or URL with ownership verification"""
+    """Search a section's links by title or URL with ownership verification (best matches first)"""
     try:
         query = request.args.get('query', '').strip()
         section_id = request.args.get('section_id', type=int)
@@ -788,22 +1078,8 @@ def search_links():
                 "message": "Section not found or access denied"
             }), 404
 
-        # Search in both title and URL fields
-        results = Link.query.filter(
-            Link.sheet_id == section_id,
-            or_(
-                Link.title.ilike(f'%{query}%'),
-                Link.link.ilike(f'%{query}%')
-            )
-        ).all()
-
-        # Format results for JSON response
-        links = [{
-            'id': link.id,
-            'title': link.title,
-            'url': link.link,
-            'status': link.status or 'unknown'
-        } for link in results]
+        # The edit form lists every match in the section, as the old ILIKE search did
+        links = find_links(current_user.id, query, None, section_id=section.id)
 
         logger.info(f"Found {len(links)} matching links")
         return jsonify(links)
@@ -860,7 +1136,9 @@ def update_link():
                 "message": "Link not found or access denied"
             }), 404
 
-        # Update the link
+        # Update the link; a new title or URL makes it a different row for upserts
+        if link.title != title or link.link != url or link.row_key is None:
+            link.row_key = next_row_key(link.sheet_id, str(title), str(url), exclude_id=link.id)
         link.title = title
         link.link = url
         link.status = status
@@ -0,0 +1,225 @@
+import re
+import logging
+from typing import Dict, List, Optional
+from flask import Flask, current_app
+from markupsafe import Markup, escape
+from sqlalchemy import and_, case, column, func, literal_column, or_, select, table
+from app.models import Spreadsheet, Sheet, Link, db
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Results returned when no limit is given, and the largest limit accepted
+# (overridable via SEARCH_RESULTS and MAX_SEARCH_RESULTS)
+DEFAULT_SEARCH_RESULTS = 20
+DEFAULT_MAX_SEARCH_RESULTS = 100
+
+# Terms of a query beyond this are ignored, which bounds the cost of a search
+MAX_QUERY_TERMS = 8
+
+# Title matches weigh more than URL matches
+TITLE_WEIGHT = 10.0
+URL_WEIGHT = 1.0
+
+# Trigram indexes can only look up terms at least this long; shorter ones are matched unindexed
+MIN_TRIGRAM_TERM = 3
+
+# SQLite: a trigram FTS5 index over links, kept in step with the table by these triggers
+links_search = table('links_search', column('rowid'), column('links_search'))
+SQLITE_TRIGGERS = ('links_search_insert', 'links_search_delete', 'links_search_update')
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct lower-cased, whitespace-separated terms of a search query"""
+    return list(dict.fromkeys(query.lower().split()))[:MAX_QUERY_TERMS]
+
+
+def highlight(value: str, terms: List[str]) -> Markup:
+    """``value`` as escaped HTML with every occurrence of a query term wrapped in <mark>"""
+    if not terms:
+        return escape(value)
+
+    parts = []
+    position = 0
+    pattern = '|'.join(map(re.escape, sorted(terms, key=len, reverse=True)))
+    for match in re.finditer(pattern, value, re.IGNORECASE):
+        parts.append(escape(value[position:match.start()]))
+        parts.append(Markup('<mark>%s</mark>') % match.group())
+        position = match.end()
+    parts.append(escape(value[position:]))
+    return Markup('').join(parts)
+
+
+def contains(column_, term: str):
+    """Case-insensitive ``term in column_``"""
+    pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    return column_.ilike(pattern, escape='\\')
+
+
+class LinkSearch:
+    """
+    Ranked search of a user's links by title and URL.
+
+    Every whitespace-separated term of the query must occur somewhere in the
+    link's title or URL, as ILIKE '%term%' would find it ("000" finds
+    "https://host/10002", "exa doc" finds "Example documents"); terms found
+    in the title rank above terms found in the URL. Subclasses run this on an
+    index; this base class is the unindexed fallback for databases without one.
+
+    The indexes are built by a migration (``flask db upgrade``); at startup
+    a backend only checks that its index exists.
+    """
+
+    name = 'like'
+
+    def detect(self, connection) -> bool:
+        """Whether the database has this backend's index structures"""
+        return True
+
+    def search(self, user_id: int, query: str, limit: Optional[int], section_id: Optional[int] = None) -> List[Dict]:
+        """The ``limit`` best matches for ``query`` among the user's links (all of them if None), best first"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+        rows = db.session.execute(self._statement(user_id, query.strip(), terms, limit, section_id)).all()
+        return [{
+            'id': row.id,
+            'title': row.title,
+            'url': row.link,
+            'status': row.status or 'unknown',
+            'pinned': bool(row.pinned),
+            'section_id': row.section_id,
+            'section_name': row.section_name,
+            'score': round(float(row.score or 0), 6),
+            'title_highlight': str(highlight(row.title, terms)),
+            'url_highlight': str(highlight(row.link, terms)),
+        } for row in rows]
+
+    @staticmethod
+    def _scoped(statement, user_id: int, section_id: Optional[int]):
+        statement = (
+            statement
+            .join(Sheet, Sheet.id == Link.sheet_id)
+            .join(Spreadsheet, Spreadsheet.id == Sheet.spreadsheet_id)
+            .where(Spreadsheet.user_id == user_id)
+        )
+        if section_id is not None:
+            statement = statement.where(Link.sheet_id == section_id)
+        return statement
+
+    @staticmethod
+    def _columns():
+        return (Link.id, Link.title, Link.link, Link.status, Link.pinned,
+                Sheet.id.label('section_id'), Sheet.name.label('section_name'))
+
+    @staticmethod
+    def _matches(terms: List[str]):
+        return and_(*(or_(contains(Link.title, term), contains(Link.link, term)) for term in terms))
+
+    @staticmethod
+    def _score(terms: List[str]):
+        return sum(
+            case((contains(Link.title, term), TITLE_WEIGHT), else_=0.0) +
+            case((contains(Link.link, term), URL_WEIGHT), else_=0.0)
+            for term in terms
+        )
+
+    def _ordered(self, statement, score, user_id: int, limit: Optional[int], section_id: Optional[int]):
+        return (
+            self._scoped(statement, user_id, section_id)
+            .order_by(score.desc(), Link.pinned.desc(), Link.id)
+            .limit(limit)
+        )
+
+    def _statement(self, user_id: int, query: str, terms: List[str], limit: Optional[int], section_id: Optional[int]):
+        score = self._score(terms).label('score')
+        statement = select(*self._columns(), score).select_from(Link).where(self._matches(terms))
+        return self._ordered(statement, score, user_id, limit, section_id)
+
+
+class PostgresLinkSearch(LinkSearch):
+    """
+    The ILIKE search on pg_trgm GIN indexes of title and URL, which serve
+    every term of three or more characters, with the trigram similarity of
+    title and query added to the rank. Without pg_trgm it runs unindexed.
+    """
+
+    name = 'postgresql'
+    trigram = False
+
+    def detect(self, connection) -> bool:
+        indexes = {name for name, in connection.exec_driver_sql(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'links'"
+        )}
+        self.trigram = {'ix_links_title_trgm', 'ix_links_link_trgm'} <= indexes
+        if not self.trigram:
+            logger.warning("pg_trgm indexes on links are missing, link search will not be indexed")
+        return True
+
+    def _statement(self, user_id: int, query: str, terms: List[str], limit: Optional[int], section_id: Optional[int]):
+        score = self._score(terms)
+        if self.trigram:
+            score = score + func.similarity(Link.title, query)
+        score = score.label('score')
+        statement = select(*self._columns(), score).select_from(Link).where(self._matches(terms))
+        return self._ordered(statement, score, user_id, limit, section_id)
+
+
+class SqliteLinkSearch(LinkSearch):
+    """
+    Search on an external-content FTS5 table, ``links_search``, with the
+    trigram tokenizer, which triggers on ``links`` keep up to date; ranked
+    by bm25. Terms shorter than a trigram are matched with LIKE.
+    """
+
+    name = 'sqlite'
+
+    def detect(self, connection) -> bool:
+        existing = {name for name, in connection.exec_driver_sql("SELECT name FROM sqlite_master")}
+        # Without its triggers (links was recreated) the index no longer follows the table
+        return 'links_search' in existing and existing.issuperset(SQLITE_TRIGGERS)
+
+    def _statement(self, user_id: int, query: str, terms: List[str], limit: Optional[int], section_id: Optional[int]):
+        indexed = [term for term in terms if len(term) >= MIN_TRIGRAM_TERM]
+        if not indexed:
+            return super()._statement(user_id, query, terms, limit, section_id)
+
+        # bm25 is lower for better matches
+        score = literal_column(f'-bm25(links_search, {TITLE_WEIGHT}, {URL_WEIGHT})').label('score')
+        fts_query = ' '.join('"{}"'.format(term.replace('"', '""')) for term in indexed)
+        statement = (
+            select(*self._columns(), score)
+            .select_from(links_search)
+            .join(Link, Link.id == links_search.c.rowid)
+            .where(links_search.c.links_search.match(fts_query))
+        )
+        short = [term for term in terms if len(term) < MIN_TRIGRAM_TERM]
+        if short:
+            statement = statement.where(self._matches(short))
+        return self._ordered(statement, score, user_id, limit, section_id)
+
+
+SEARCH_BACKENDS = {
+    'postgresql': PostgresLinkSearch,
+    'sqlite': SqliteLinkSearch,
+}
+
+
+def init_link_search(app: Flask) -> LinkSearch:
+    """Pick the search backend the app's database is indexed for and remember it in ``app.extensions``"""
+    backend = SEARCH_BACKENDS.get(db.engine.dialect.name, LinkSearch)()
+    with db.engine.connect() as connection:
+        if not backend.detect(connection):
+            logger.warning("Link search is not indexed (run `flask db upgrade`); searching unindexed")
+            backend = LinkSearch()
+    app.extensions['link_search'] = backend
+    logger.debug(f"Link search backend: {backend.name}")
+    return backend
+
+
+def find_links(user_id: int, query: str, limit: Optional[int], section_id: Optional[int] = None) -> List[Dict]:
+    """Ranked, highlighted search of a user's links (or of one of their sections) by title and URL
+
+    ``limit`` caps the number of results; None returns every match.
+    """
+    return current_app.extensions['link_search'].search(user_id, query, limit, section_id)
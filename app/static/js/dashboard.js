@@ -115,13 +115,72 @@ async function handleFileUpload(e) {
             throw new Error(data.message || 'Upload failed');
         }
 
-        await handleUploadSuccess(elements, data, form);
+        if (data.status === 'unchanged') {
+            await handleUploadSuccess(elements, data, form);
+            return;
+        }
+
+        // The upload is accepted as a background job; wait for it to finish
+        const job = await waitForUploadJob(data, elements);
+        if (job.status !== 'Completed') {
+            throw new Error(job.error || 'Processing failed');
+        }
+
+        await handleUploadSuccess(elements, { ...data, message: 'File processed successfully' }, form);
 
     } catch (error) {
         handleUploadError(elements, error);
     }
 }
 
+function showUploadJob(job, elements) {
+    elements.progress.style.width = `${job.progress}%`;
+    elements.percentage.textContent = `${job.progress}%`;
+    elements.status.textContent = job.status || '';
+    return job.status === 'Completed' || job.status === 'Failed';
+}
+
+async function waitForUploadJob(data, elements) {
+    clearInterval(elements.progress.dataset.interval);
+    if (window.EventSource && data.events_url) {
+        const job = await streamUploadJob(data.events_url, elements);
+        if (job) {
+            return job;
+        }
+    }
+    return pollUploadJob(data.progress_url, elements);
+}
+
+// Resolves with the finished job, or null if the stream fails so the caller can poll instead
+function streamUploadJob(eventsUrl, elements) {
+    return new Promise((resolve) => {
+        const source = new EventSource(eventsUrl);
+        source.addEventListener('progress', (event) => {
+            const job = JSON.parse(event.data);
+            if (showUploadJob(job, elements)) {
+                source.close();
+                resolve(job);
+            }
+        });
+        source.onerror = () => {
+            source.close();
+            resolve(null);
+        };
+    });
+}
+
+async function pollUploadJob(progressUrl, elements) {
+    while (true) {
+        const response = await fetch(progressUrl, { credentials: 'same-origin' });
+        const job = await response.json();
+
+        if (showUploadJob(job, elements) || !response.ok) {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, 500));
+    }
+}
+
 function handleUploadSuccess(elements, data, form) {
     return new Promise((resolve) => {
         elements.progress.style.width = "100%";
@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+from contextlib import suppress
+from typing import Dict, List, Optional
+from flask import Request, current_app, request
+from flask_login import current_user
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import cached_property, secure_filename
+from app.jobs import job_upload_path, new_job_id
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Leading bytes of each accepted format: xlsx is a zip archive, xls an OLE2 compound file
+FILE_SIGNATURES = {
+    'xlsx': (b'PK\x03\x04',),
+    'xls': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+    'csv.gz': (b'\x1f\x8b',),
+    'zip': (b'PK\x03\x04',),
+}
+SNIFF_BYTES = 512
+
+
+def content_matches_extension(head: bytes, extension: str) -> bool:
+    """Check a file's leading bytes against the format its extension claims"""
+    signatures = FILE_SIGNATURES.get(extension.lower())
+    if signatures:
+        return head.startswith(signatures)
+    # CSV: plain text, so no NUL bytes and no binary container signature
+    binary = [sig for sigs in FILE_SIGNATURES.values() for sig in sigs]
+    return b'\x00' not in head and not head.startswith(tuple(binary))
+
+
+class UploadSpool:
+    """
+    File-like sink the multipart parser writes an upload into.
+
+    Bytes go straight to the job's storage path while being hashed and
+    counted, so the request body is read exactly once. Writing past
+    ``max_size`` deletes the partial file and raises RequestEntityTooLarge.
+    Unless ``queued`` is set once the file is handed to a job, it is
+    deleted when the request ends (see discard_unqueued_spools).
+    """
+
+    def __init__(self, file_path: str, job_id: str, max_size: int):
+        self.path = file_path
+        self.job_id = job_id
+        self.max_size = max_size
+        self.queued = False
+        self.size = 0
+        self.head = b''
+        self._digest = hashlib.sha256()
+        self._file = open(file_path, 'w+b')
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.max_size and self.size > self.max_size:
+            logger.error(f"Upload exceeded {self.max_size} bytes; aborting job {self.job_id}")
+            self.discard()
+            raise RequestEntityTooLarge()
+        if len(self.head) < SNIFF_BYTES:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+        self._digest.update(data)
+        return self._file.write(data)
+
+    @property
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+    def matches_extension(self, extension: str) -> bool:
+        """Check the leading bytes against the format the file name claims"""
+        return content_matches_extension(self.head, extension)
+
+    def close(self):
+        """Flush the stored file; it stays on disk for the upload job"""
+        if not self._file.closed:
+            self._file.close()
+
+    def discard(self):
+        """Close and delete the stored file and its job directory"""
+        self.close()
+        shutil.rmtree(os.path.dirname(self.path), ignore_errors=True)
+
+    # File protocol used by werkzeug's FileStorage
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def read(self, *args) -> bytes:
+        return self._file.read(*args)
+
+    def flush(self):
+        self._file.flush()
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+
+class UploadRequest(Request):
+    """
+    Request class that spools files sent to the upload endpoint straight into job storage.
+
+    Only signed-in users get a spool; anyone else's files go to werkzeug's
+    default temporary storage, which is gone with the request.
+    """
+
+    @cached_property
+    def upload_spools(self) -> List[UploadSpool]:
+        """Spools opened while parsing this request's form"""
+        return []
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint != 'main.upload_file' or not filename or not current_user.is_authenticated:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+        job_id = new_job_id()
+        file_path = job_upload_path(current_app, job_id, secure_filename(filename) or 'upload')
+        logger.debug(f"Spooling upload '{filename}' to {file_path}")
+        spool = UploadSpool(file_path, job_id, current_app.config.get('MAX_CONTENT_LENGTH') or 0)
+        self.upload_spools.append(spool)
+        return spool
+
+
+def discard_unqueued_spools(exception=None):
+    """
+    Teardown hook: delete spooled files that were not handed to an upload job.
+
+    The form is parsed by CSRF protection before the view runs, so a
+    request rejected there, or anywhere else before its file is queued,
+    would otherwise leave the file in UPLOAD_FOLDER.
+    """
+    for spool in getattr(request, 'upload_spools', ()):
+        if not spool.queued:
+            spool.discard()
+            logger.debug(f"Temporary file removed: {spool.path}")
+
+
+# Resumable chunked uploads
+#
+# Each chunked upload lives in its own job directory holding a manifest,
+# the partially written file (``<name>.part``) and one marker file per
+# received chunk. Everything is on disk, so any worker process can accept
+# any chunk and retries only need to resend chunks without a marker.
+# Clients cancel uploads they give up on; uploads nobody has touched for
+# longer than CHUNKED_UPLOAD_TTL are deleted by sweep_chunked_uploads,
+# which also counts each user's unfinished uploads.
+
+MANIFEST_NAME = 'upload.json'
+RECEIVED_DIR = 'received'
+
+# Idle seconds before an unfinished chunked upload is deleted, and unfinished
+# uploads allowed per user (overridable via CHUNKED_UPLOAD_TTL and CHUNKED_UPLOADS_PER_USER)
+DEFAULT_CHUNKED_UPLOAD_TTL = 24 * 60 * 60
+DEFAULT_CHUNKED_UPLOADS_PER_USER = 3
+
+
+def create_chunked_upload(user_id: int, filename: str, size: int, chunk_size: int) -> Dict:
+    """Start a chunked upload and return its manifest"""
+    upload_id = new_job_id()
+    file_path = job_upload_path(current_app, upload_id, secure_filename(filename) or 'upload')
+    upload_dir = os.path.dirname(file_path)
+    os.makedirs(os.path.join(upload_dir, RECEIVED_DIR), exist_ok=True)
+
+    manifest = {
+        "upload_id": upload_id,
+        "user_id": user_id,
+        "filename": os.path.basename(file_path),
+        "size": size,
+        "chunk_size": chunk_size,
+        "total_chunks": max(1, -(-size // chunk_size)),
+    }
+    with open(os.path.join(upload_dir, MANIFEST_NAME), 'w') as handle:
+        json.dump(manifest, handle)
+    # Pre-size the file so chunks can be written at their offsets in any order
+    with open(file_path + '.part', 'wb') as handle:
+        handle.truncate(size)
+
+    logger.info(f"Chunked upload {upload_id} started: {filename}, {size} bytes in {manifest['total_chunks']} chunks")
+    return manifest
+
+
+def last_chunked_upload_activity(upload_dir: str) -> float:
+    """Time of the last request for the upload (see load_chunked_upload), 0.0 if it is gone"""
+    try:
+        return os.path.getmtime(os.path.join(upload_dir, MANIFEST_NAME))
+    except OSError:
+        return 0.0
+
+
+def sweep_chunked_uploads(max_age: int) -> Dict[int, List[float]]:
+    """
+    Delete chunked uploads idle for more than ``max_age`` seconds and return
+    the last-activity times of the remaining ones, by user.
+
+    Only directories holding a manifest are chunked uploads in progress;
+    completed uploads and regular upload jobs belong to the job that owns them.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    now = time.time()
+    active: Dict[int, List[float]] = {}
+
+    try:
+        names = os.listdir(upload_folder)
+    except OSError:
+        return active
+
+    for name in names:
+        upload_dir = os.path.join(upload_folder, name)
+        try:
+            with open(os.path.join(upload_dir, MANIFEST_NAME)) as handle:
+                manifest = json.load(handle)
+        except (OSError, ValueError):
+            continue
+
+        last_activity = last_chunked_upload_activity(upload_dir)
+        if now - last_activity > max_age:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            logger.info(f"Chunked upload {name} expired after {int(now - last_activity)}s idle; removed")
+            continue
+        active.setdefault(manifest.get("user_id"), []).append(last_activity)
+
+    return active
+
+
+def load_chunked_upload(upload_id: str, user_id: int) -> Optional[Dict]:
+    """
+    Return the manifest of a user's chunked upload, or None if unknown or not theirs.
+
+    Loading an upload counts as activity on it: the manifest's mtime is
+    what CHUNKED_UPLOAD_TTL is measured from, so an upload that is being
+    sent or resumed never expires, however long ago it was started.
+    """
+    if not upload_id.isalnum():
+        return None
+    manifest_path = os.path.join(current_app.config['UPLOAD_FOLDER'], upload_id, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("user_id") != user_id:
+        return None
+    with suppress(OSError):
+        os.utime(manifest_path)
+    return manifest
+
+
+def cancel_chunked_upload(manifest: Dict):
+    """Delete an unfinished chunked upload and everything received for it"""
+    shutil.rmtree(chunked_upload_dir(manifest), ignore_errors=True)
+    logger.info(f"Chunked upload {manifest['upload_id']} cancelled")
+
+
+def chunked_upload_dir(manifest: Dict) -> str:
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], manifest["upload_id"])
+
+
+def expected_chunk_length(manifest: Dict, index: int) -> int:
+    start = index * manifest["chunk_size"]
+    return max(0, min(manifest["chunk_size"], manifest["size"] - start))
+
+
+def write_chunk(manifest: Dict, index: int, stream, read_size: int = 64 * 1024):
+    """Copy one chunk from ``stream`` into place; raises ValueError on a bad index or length"""
+    if not 0 <= index < manifest["total_chunks"]:
+        raise ValueError(f"Chunk index {index} out of range")
+
+    expected = expected_chunk_length(manifest, index)
+    upload_dir = chunked_upload_dir(manifest)
+    part_path = os.path.join(upload_dir, manifest["filename"] + '.part')
+    marker_path = os.path.join(upload_dir, RECEIVED_DIR, str(index))
+
+    # A resend overwrites the chunk's bytes, so it counts as missing until it succeeds
+    if os.path.exists(marker_path):
+        os.remove(marker_path)
+
+    written = 0
+    with open(part_path, 'r+b') as handle:
+        handle.seek(index * manifest["chunk_size"])
+        for data in iter(lambda: stream.read(read_size), b''):
+            written += len(data)
+            if written > expected:
+                raise ValueError(f"Chunk {index} is longer than {expected} bytes")
+            handle.write(data)
+
+    if written != expected:
+        raise ValueError(f"Chunk {index} has {written} bytes, expected {expected}")
+
+    # The marker is only created once the chunk's bytes are fully written
+    open(marker_path, 'w').close()
+
+
+def received_chunks(manifest: Dict) -> List[int]:
+    received_dir = os.path.join(chunked_upload_dir(manifest), RECEIVED_DIR)
+    return sorted(int(name) for name in os.listdir(received_dir) if name.isdigit())
+
+
+def chunked_upload_status(manifest: Dict) -> Dict:
+    """Manifest plus the received chunk indices collapsed into [start, end] ranges, and what is missing"""
+    received = received_chunks(manifest)
+    received_set = set(received)
+
+    ranges: List[List[int]] = []
+    for index in received:
+        if ranges and ranges[-1][1] == index - 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+
+    return {
+        **{key: value for key, value in manifest.items() if key != "user_id"},
+        "received_ranges": ranges,
+        "missing": [i for i in range(manifest["total_chunks"]) if i not in received_set],
+    }
+
+
+def finish_chunked_upload(manifest: Dict) -> str:
+    """Move the completed file into place, drop the bookkeeping and return its path"""
+    upload_dir = chunked_upload_dir(manifest)
+    file_path = os.path.join(upload_dir, manifest["filename"])
+    os.replace(file_path + '.part', file_path)
+    os.remove(os.path.join(upload_dir, MANIFEST_NAME))
+    shutil.rmtree(os.path.join(upload_dir, RECEIVED_DIR), ignore_errors=True)
+    return file_path
+
+
+def read_head(file_path: str) -> bytes:
+    with open(file_path, 'rb') as handle:
+        return handle.read(SNIFF_BYTES)
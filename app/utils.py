@@ -1,11 +1,25 @@
+import gzip
+import hashlib
+import io
+import multiprocessing
 import os
+import tempfile
+import threading
+import uuid
+import zipfile
 import pandas as pd
-from sqlalchemy import inspect, text
+from flask import current_app
+from openpyxl import load_workbook
+from sqlalchemy import bindparam, delete, insert, select, true, tuple_, update
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from app.models import Spreadsheet, Sheet, Link, db
+from app.progress import IngestMetrics, start_upload_progress, update_upload_progress
 import logging
+from collections import deque
+from contextlib import suppress
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from typing import BinaryIO, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 
 def normalize_column_name(col: str) -> str:
@@ -15,123 +29,719 @@ def normalize_column_name(col: str) -> str:
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-# Global progress tracker for uploads
-UPLOAD_PROGRESS: Dict[int, Dict] = {}
-
 # Allowed file extensions and required columns
-ALLOWED_EXTENSIONS = {'csv', 'xls', 'xlsx'}
+ALLOWED_EXTENSIONS = {'csv', 'xls', 'xlsx', 'csv.gz', 'zip'}
 REQUIRED_COLUMNS = {'title', 'link', 'status'}
 
+# Formats read chunk by chunk, header row first (see read_and_validate_file)
+STREAMED_EXTENSIONS = ('.csv', '.xlsx', '.csv.gz', '.zip')
+
+# Compressed uploads: a gzip-compressed CSV, or a zip archive of CSV/XLSX files
+COMPRESSED_EXTENSIONS = ('.csv.gz', '.zip')
+ARCHIVE_MEMBER_EXTENSIONS = ('.csv', '.xlsx')
+
+# Zip bomb limits (overridable via MAX_DECOMPRESSED_SIZE / MAX_ARCHIVE_ENTRIES)
+DEFAULT_MAX_DECOMPRESSED_SIZE = 1024 * 1024 * 1024
+DEFAULT_MAX_ARCHIVE_ENTRIES = 100
+
+# Rows per chunk when streaming uploads (overridable via CSV_CHUNK_SIZE / EXCEL_CHUNK_SIZE)
+DEFAULT_CSV_CHUNK_SIZE = 10000
+DEFAULT_EXCEL_CHUNK_SIZE = 10000
+
+# Rows per executemany INSERT batch (overridable via INSERT_BATCH_SIZE)
+DEFAULT_INSERT_BATCH_SIZE = 1000
+
+# Process pool for parallel sheet parsing, created on first use (see PARSE_WORKERS)
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def file_extension(filename: str) -> str:
+    """Lower-case extension of an upload; gzip-compressed CSVs keep both parts ('csv.gz')"""
+    lower_name = filename.lower()
+    if lower_name.endswith('.csv.gz'):
+        return 'csv.gz'
+    return lower_name.rsplit('.', 1)[1] if '.' in lower_name else ''
+
 
 def allowed_file(filename: str) -> bool:
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return file_extension(filename) in ALLOWED_EXTENSIONS
 
 
-def process_uploaded_file(file_path: str, user_id: int) -> str:
-    """Process uploaded file with comprehensive validation and error handling"""
-    global UPLOAD_PROGRESS
-    uploaded_file_name = os.path.basename(file_path)
+def spreadsheet_name(filename: str) -> str:
+    """Spreadsheet an upload is stored as: 'links.csv.gz' updates the same spreadsheet as 'links.csv'"""
+    return filename[:-len('.gz')] if filename.lower().endswith('.csv.gz') else filename
+
+
+def process_uploaded_file(
+        file_path: str,
+        user_id: int,
+        job_id: Optional[str] = None,
+        content_hash: Optional[str] = None
+) -> str:
+    """Process uploaded file with comprehensive validation and error handling
+
+    Progress is recorded in the upload progress store under ``job_id`` (a
+    new id is generated when none is given). ``content_hash`` is the file's SHA-256,
+    stored on the spreadsheet; it is computed here when not supplied.
+    """
+    job_id = job_id or uuid.uuid4().hex
+    content_hash = content_hash or file_sha256(file_path)
+    uploaded_file_name = spreadsheet_name(os.path.basename(file_path))
     validation_errors: List[str] = []
     status = "uploaded"
+    sheet_data: Dict[str, Union[pd.DataFrame, SheetChunks]] = {}
+    result: Optional[str] = None
+    error: Optional[str] = None
+    error_code: Optional[str] = None
+
+    # Row counts, throughput and phase timings are published after every chunk
+    def publish_metrics(current: IngestMetrics):
+        fields = current.snapshot()
+        fraction = current.fraction_done()
+        if fraction is not None:
+            fields["progress"] = min(20 + int(fraction * 70), 90)
+        update_upload_progress(job_id, fields)
+
+    metrics = IngestMetrics(os.path.getsize(file_path), on_update=publish_metrics)
 
     try:
-        UPLOAD_PROGRESS[user_id] = {
-            "status": "Initializing",
-            "progress": 0,
-            "current_sheet": ""
-        }
+        start_upload_progress(job_id, user_id, uploaded_file_name)
+        update_upload_progress(job_id, {"status": "Initializing"})
+
+        # Streamed CSV chunks report how much of the file has been read
+        def callback_for_chunk(bytes_read: int, total_bytes: int):
+            metrics.bytes_processed = bytes_read
+
+        # CSV and .xlsx are opened header-first below; a legacy .xls workbook
+        # would be parsed whole, so check its header rows before that
+        if not file_path.lower().endswith(STREAMED_EXTENSIONS):
+            with metrics.phase('validate'):
+                validation_errors = validate_file_headers(file_path)
+            if validation_errors:
+                raise ValueError("\n".join(validation_errors))
 
         # Read and validate file structure
-        UPLOAD_PROGRESS[user_id].update({"status": "Reading file", "progress": 5})
-        sheet_data, file_type = read_and_validate_file(file_path)
+        update_upload_progress(job_id, {"status": "Reading file", "progress": 5})
+        with metrics.phase('read'):
+            sheet_data, file_type = read_and_validate_file(file_path, chunk_callback=callback_for_chunk)
 
-        UPLOAD_PROGRESS[user_id].update({"status": "Validating", "progress": 10})
-        validate_sheet_structures(sheet_data, validation_errors)
+        update_upload_progress(job_id, {"status": "Validating", "progress": 10})
+        with metrics.phase('validate'):
+            validate_sheet_structures(sheet_data, validation_errors)
 
         if validation_errors:
             raise ValueError("\n".join(validation_errors))
 
+        # Multi-sheet workbooks can be parsed and cleaned on a process pool
+        parse_workers = current_app.config.get('PARSE_WORKERS', 0)
+        data_sheets = [n for n in sheet_data if n.lower() != 'credentials']
+        if parse_workers > 1 and file_path.lower().endswith('.xlsx') and len(data_sheets) > 1:
+            for sheet in sheet_data.values():
+                sheet.close()
+            sheet_data = parse_sheets_in_parallel(file_path, data_sheets, parse_workers)
+        metrics.expected_rows = expected_row_count(sheet_data)
+
         # Process valid file
-        UPLOAD_PROGRESS[user_id].update({"status": "Database setup", "progress": 20})
+        update_upload_progress(job_id, {"status": "Database setup", "progress": 20})
         existing_spreadsheet = Spreadsheet.query.filter_by(
             name=uploaded_file_name,
             user_id=user_id
         ).first()
 
+        incremental = bool(existing_spreadsheet) and current_app.config.get('INCREMENTAL_SYNC', True)
         if existing_spreadsheet:
             status = "updated"
-            logger.info(f"Replacing existing file: {uploaded_file_name}")
-            cleanup_existing_spreadsheet(existing_spreadsheet)
+            if incremental:
+                logger.info(f"Syncing existing file: {uploaded_file_name}")
+            else:
+                logger.info(f"Replacing existing file: {uploaded_file_name}")
+                cleanup_existing_spreadsheet(existing_spreadsheet)
 
         # Process sheets with progress tracking
         total_sheets = len([n for n in sheet_data if n.lower() != 'credentials'])
         processed_sheets = 0
 
-        # This `update_progress` is specific to `process_uploaded_file`'s context
-        # and will be passed down to `process_valid_spreadsheet`.
+        # Called by process_valid_spreadsheet as each sheet starts
         def callback_for_progress(current_sheet_name: str, sheet_count: int, total_count: int):
-            nonlocal processed_sheets # Use nonlocal to modify `processed_sheets` in the outer function
-            processed_sheets = sheet_count # Update processed_sheets based on the callback
-            progress = 20 + int((processed_sheets / total_count) * 70) if total_count else 0
-            UPLOAD_PROGRESS[user_id].update({
+            nonlocal processed_sheets
+            processed_sheets = sheet_count
+            fields = {
                 "status": f"Processing {current_sheet_name}",
-                "progress": progress,
                 "current_sheet": current_sheet_name
-            })
-
+            }
+            # Row or byte counts drive progress when available; otherwise count finished sheets
+            if metrics.fraction_done() is None:
+                fields["progress"] = 20 + int(((processed_sheets - 1) / total_count) * 70) if total_count else 0
+            update_upload_progress(job_id, fields)
+
+
+        if incremental:
+            result = sync_spreadsheet(
+                existing_spreadsheet,
+                sheet_data,
+                status,
+                progress_callback=callback_for_progress,
+                content_hash=content_hash,
+                metrics=metrics
+            )
+        else:
+            result = process_valid_spreadsheet(
+                uploaded_file_name,
+                user_id,
+                sheet_data,
+                status,
+                progress_callback=callback_for_progress, # Pass the local callback
+                content_hash=content_hash,
+                metrics=metrics
+            )
 
-        result = process_valid_spreadsheet(
-            uploaded_file_name,
-            user_id,
-            sheet_data,
-            status,
-            progress_callback=callback_for_progress # Pass the local callback
-        )
-
-        UPLOAD_PROGRESS[user_id].update({"status": "Finalizing", "progress": 95})
-        db.session.commit()
+        update_upload_progress(job_id, {"status": "Finalizing", "progress": 95})
+        with metrics.phase('commit'):
+            db.session.commit()
+        metrics.bytes_processed = metrics.total_bytes
 
         return result
 
     except ValueError as ve:
         db.session.rollback()
         logger.warning(f"Validation errors:\n{str(ve)}")
+        error = str(ve)
+        error_code = "VALIDATION_FAILURE"
         raise
     except IntegrityError as e:
         db.session.rollback()
         logger.error(f"Database integrity error: {str(e)}")
+        error = "Database integrity error"
+        error_code = "DB_SAVE_FAILURE"
         raise
     except Exception as e:
         db.session.rollback()
         logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        error = "Unexpected error while processing file"
+        error_code = "DB_SAVE_FAILURE" if isinstance(e, SQLAlchemyError) else "SYSTEM_FAILURE"
         raise
     finally:
-        # Ensure progress is set to 100% or an error state on completion/failure
-        if user_id in UPLOAD_PROGRESS:
-            if "error" in UPLOAD_PROGRESS[user_id]:
-                UPLOAD_PROGRESS[user_id].update({"progress": 100, "status": "Failed"})
-            else:
-                UPLOAD_PROGRESS[user_id].update({"progress": 100, "status": "Completed"})
-        # UPLOAD_PROGRESS.pop(user_id, None) # Consider keeping it for a short while for client to fetch final state
+        # Release file handles held by streamed sheets that were not fully read
+        for sheet in sheet_data.values():
+            if isinstance(sheet, SheetChunks):
+                sheet.close()
+
+        # Ensure progress is set to 100% or an error state on completion/failure. The outcome
+        # goes out with the final status: watchers stop reading once they see it
+        final_metrics = metrics.snapshot()
+        if error:
+            update_upload_progress(job_id, {
+                **final_metrics, "progress": 100, "status": "Failed", "error": error, "error_code": error_code
+            })
+        else:
+            update_upload_progress(job_id, {
+                **final_metrics, "progress": 100, "eta_seconds": 0, "status": "Completed", "result": result
+            })
+        logger.info(
+            f"Upload {job_id} '{uploaded_file_name}' {'failed' if error else status}: {metrics.summary()}"
+        )
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 hex digest of a file on disk"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
+def find_unchanged_spreadsheet(user_id: int, filename: str, content_hash: str) -> Optional[Spreadsheet]:
+    """The user's spreadsheet of this name if its last ingested upload had the same digest"""
+    return Spreadsheet.query.filter_by(
+        user_id=user_id,
+        name=spreadsheet_name(filename),
+        content_hash=content_hash
+    ).first()
+
+
+def read_sheet_headers(file_path: str) -> Dict[str, List[str]]:
+    """Read only the header row of each sheet, without parsing any data rows"""
+    lower_path = file_path.lower()
+    if lower_path.endswith('.xlsx'):
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            return {worksheet.title: worksheet_header(worksheet) for worksheet in workbook.worksheets}
+        finally:
+            workbook.close()
+    if lower_path.endswith('.xls'):
+        frames = pd.read_excel(file_path, sheet_name=None, nrows=0)
+        return {name: list(frame.columns) for name, frame in frames.items()}
+    if lower_path.endswith('.csv'):
+        return {"Default": list(pd.read_csv(file_path, nrows=0).columns)}
+    if lower_path.endswith('.csv.gz'):
+        max_bytes = current_app.config.get('MAX_DECOMPRESSED_SIZE', DEFAULT_MAX_DECOMPRESSED_SIZE)
+        with open(file_path, 'rb') as raw, gzip_reader(max_bytes)(raw) as handle:
+            return {"Default": list(pd.read_csv(handle, nrows=0).columns)}
+    if lower_path.endswith('.zip'):
+        return read_archive_headers(file_path)
+    raise ValueError("Unsupported file format")
 
-def read_and_validate_file(file_path: str) -> tuple:
-    """Read file and return data with file type"""
-    if file_path.lower().endswith(('.xls', '.xlsx')):
+
+def read_archive_headers(file_path: str) -> Dict[str, List[str]]:
+    """Header rows of the CSV members of a zip archive, after checking it against the zip bomb limits
+
+    CSV members are inflated only as far as their header row. XLSX members
+    would have to be copied out of the archive before openpyxl can open
+    them, so their headers are left to the upload job, which validates every
+    sheet again before writing anything.
+    """
+    max_bytes = current_app.config.get('MAX_DECOMPRESSED_SIZE', DEFAULT_MAX_DECOMPRESSED_SIZE)
+    budget = DecompressionBudget(max_bytes)
+    headers: Dict[str, List[str]] = {}
+    used_names: Set[str] = set()
+
+    with zipfile.ZipFile(file_path) as archive:
+        members = archive_members(
+            archive, max_bytes, current_app.config.get('MAX_ARCHIVE_ENTRIES', DEFAULT_MAX_ARCHIVE_ENTRIES)
+        )
+        for info in members:
+            if not info.filename.lower().endswith('.csv'):
+                continue
+            name = unique_sheet_name(os.path.splitext(os.path.basename(info.filename))[0], used_names)
+            with limited_reader(archive.open(info), budget) as handle:
+                headers[name] = list(pd.read_csv(handle, nrows=0).columns)
+
+    return headers
+
+
+def validate_file_headers(file_path: str) -> List[str]:
+    """Structural validation from header rows alone; returns the same per-sheet errors as a full read"""
+    errors: List[str] = []
+    validate_sheet_headers(read_sheet_headers(file_path), errors)
+    return errors
+
+
+def read_and_validate_file(file_path: str, chunk_callback: Optional[Callable[[int, int], None]] = None) -> tuple:
+    """Read file and return data with file type
+
+    CSV and .xlsx files are not loaded up front: each sheet is a SheetChunks
+    stream that is read chunk by chunk while it is being inserted. Legacy .xls
+    workbooks are not supported by openpyxl and are still parsed whole.
+    Compressed uploads (.csv.gz, .zip) are decompressed as they are read.
+    """
+    if file_path.lower().endswith(COMPRESSED_EXTENSIONS):
+        max_bytes = current_app.config.get('MAX_DECOMPRESSED_SIZE', DEFAULT_MAX_DECOMPRESSED_SIZE)
+        csv_chunk_size = current_app.config.get('CSV_CHUNK_SIZE', DEFAULT_CSV_CHUNK_SIZE)
+        if file_path.lower().endswith('.csv.gz'):
+            return {"Default": stream_csv(file_path, csv_chunk_size, chunk_callback, gzip_reader(max_bytes))}, 'csv'
+        return stream_zip(
+            file_path,
+            csv_chunk_size,
+            current_app.config.get('EXCEL_CHUNK_SIZE', DEFAULT_EXCEL_CHUNK_SIZE),
+            max_bytes,
+            current_app.config.get('MAX_ARCHIVE_ENTRIES', DEFAULT_MAX_ARCHIVE_ENTRIES),
+            chunk_callback
+        ), 'archive'
+    if file_path.lower().endswith('.xlsx'):
+        chunk_size = current_app.config.get('EXCEL_CHUNK_SIZE', DEFAULT_EXCEL_CHUNK_SIZE)
+        return stream_xlsx(file_path, chunk_size), 'excel'
+    if file_path.lower().endswith('.xls'):
         return pd.read_excel(file_path, sheet_name=None), 'excel'
     if file_path.lower().endswith('.csv'):
-        return {"Default": pd.read_csv(file_path)}, 'csv'
+        chunk_size = current_app.config.get('CSV_CHUNK_SIZE', DEFAULT_CSV_CHUNK_SIZE)
+        return {"Default": stream_csv(file_path, chunk_size, chunk_callback)}, 'csv'
     raise ValueError("Unsupported file format")
 
 
-def validate_sheet_structures(sheet_data: Dict[str, pd.DataFrame], errors: List[str]):
+class SheetChunks:
+    """
+    A sheet whose rows are read lazily as a sequence of DataFrame chunks.
+
+    ``columns`` holds the header up front so the sheet can be validated before
+    any row is parsed; iterating yields chunks with normalized column names.
+    ``expected_rows`` is the number of data rows when the source records it.
+    A SheetChunks can only be iterated once.
+    """
+
+    def __init__(
+            self,
+            columns: Iterable[str],
+            chunks: Iterator[pd.DataFrame],
+            on_close: Optional[Callable[[], None]] = None,
+            expected_rows: Optional[int] = None
+    ):
+        self.columns = [normalize_column_name(str(col)) for col in columns]
+        self.expected_rows = expected_rows
+        self._chunks = chunks
+        self._on_close = on_close
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        for chunk in self._chunks:
+            chunk.columns = [normalize_column_name(str(col)) for col in chunk.columns]
+            yield chunk
+
+    def close(self):
+        """Stop reading and release the underlying file"""
+        if hasattr(self._chunks, 'close'):
+            self._chunks.close()
+        if self._on_close:
+            self._on_close()
+
+
+def expected_row_count(sheet_data: Dict[str, Union[pd.DataFrame, SheetChunks]]) -> Optional[int]:
+    """Total data rows across sheets, or None if any sheet's size is not known before reading it"""
+    total = 0
+    for sheet_name, sheet in sheet_data.items():
+        if sheet_name.lower() == 'credentials':
+            continue
+        rows = len(sheet) if isinstance(sheet, pd.DataFrame) else sheet.expected_rows
+        if rows is None:
+            return None
+        total += rows
+    return total
+
+
+def stream_csv(
+        file_path: str,
+        chunk_size: int,
+        chunk_callback: Optional[Callable[[int, int], None]] = None,
+        decompress: Optional[Callable[[BinaryIO], BinaryIO]] = None
+) -> SheetChunks:
+    """Open a CSV file as a SheetChunks stream of at most ``chunk_size`` rows per chunk.
+
+    ``chunk_callback(bytes_read, total_bytes)`` is called after each chunk is parsed.
+    ``decompress(raw)`` wraps the opened file when its CSV is compressed;
+    progress is still measured in bytes of the file on disk.
+    """
+    wrap = decompress or (lambda raw: raw)
+    with open(file_path, 'rb') as raw, wrap(raw) as handle:
+        header = pd.read_csv(handle, nrows=0).columns
+    total_bytes = os.path.getsize(file_path)
+
+    def chunks() -> Iterator[pd.DataFrame]:
+        with open(file_path, 'rb') as raw, wrap(raw) as handle:
+            # dtype=str keeps column types identical from one chunk to the next
+            for chunk in pd.read_csv(handle, chunksize=chunk_size, dtype=str):
+                if chunk_callback:
+                    chunk_callback(raw.tell(), total_bytes)
+                yield chunk
+
+    return SheetChunks(header, chunks())
+
+
+def stream_xlsx(
+        file_path: str,
+        chunk_size: int,
+        on_close: Optional[Callable[[], None]] = None
+) -> Dict[str, SheetChunks]:
+    """Open an .xlsx workbook in openpyxl read-only mode as one SheetChunks stream per sheet.
+
+    Only the header row of each sheet is read here; data rows are parsed from
+    the workbook XML as each sheet is iterated, ``chunk_size`` rows at a time.
+    ``on_close`` runs after the workbook is closed.
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    sheets: Dict[str, SheetChunks] = {}
+
+    def close():
+        workbook.close()
+        if on_close:
+            on_close()
+
+    for worksheet in workbook.worksheets:
+        header = worksheet_header(worksheet)
+        # The sheet's dimension record gives its size without reading rows; it may be absent
+        max_row = worksheet.max_row
+        sheets[worksheet.title] = SheetChunks(
+            header,
+            _iter_worksheet_chunks(worksheet, header, chunk_size),
+            on_close=close,
+            expected_rows=max(max_row - 1, 0) if max_row else None
+        )
+
+    return sheets
+
+
+def worksheet_header(worksheet) -> List[str]:
+    """Column names from a worksheet's first row"""
+    header_row = next(worksheet.iter_rows(max_row=1, values_only=True), ())
+    # Blank header cells get the same placeholder names pandas would give them
+    return [
+        value if value is not None else f"Unnamed: {index}"
+        for index, value in enumerate(header_row)
+    ]
+
+
+def _iter_worksheet_chunks(worksheet, header: List[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yield the data rows of a read-only worksheet as DataFrames of at most ``chunk_size`` rows"""
+    width = len(header)
+    batch: List[tuple] = []
+
+    for row in worksheet.iter_rows(min_row=2, values_only=True):
+        # Read-only rows are not padded to the header width
+        batch.append(tuple(row[:width]) + (None,) * (width - len(row)))
+        if len(batch) >= chunk_size:
+            yield pd.DataFrame.from_records(batch, columns=header)
+            batch = []
+
+    if batch:
+        yield pd.DataFrame.from_records(batch, columns=header)
+
+
+class DecompressionLimitExceeded(ValueError):
+    """A compressed upload expands past MAX_DECOMPRESSED_SIZE or holds more than MAX_ARCHIVE_ENTRIES entries"""
+
+
+class DecompressionBudget:
+    """Running count of bytes decompressed from one upload, shared by all of its streams"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+
+    def consume(self, size: int):
+        self.used += size
+        if self.limit and self.used > self.limit:
+            raise DecompressionLimitExceeded(f"Decompressed upload exceeds {self.limit} bytes")
+
+
+class LimitedReader(io.RawIOBase):
+    """Binary stream over a decompressing reader that charges every byte read to a DecompressionBudget"""
+
+    def __init__(self, stream: BinaryIO, budget: DecompressionBudget):
+        self._stream = stream
+        self._budget = budget
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        self._budget.consume(len(data))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._stream.close()
+        super().close()
+
+
+def limited_reader(stream: BinaryIO, budget: DecompressionBudget) -> BinaryIO:
+    return io.BufferedReader(LimitedReader(stream, budget))
+
+
+def gzip_reader(max_bytes: int) -> Callable[[BinaryIO], BinaryIO]:
+    """``decompress`` hook for stream_csv that gunzips the file, at most ``max_bytes`` of output per read-through"""
+    return lambda raw: limited_reader(gzip.GzipFile(fileobj=raw, mode='rb'), DecompressionBudget(max_bytes))
+
+
+def archive_members(archive: zipfile.ZipFile, max_bytes: int, max_entries: int) -> List[zipfile.ZipInfo]:
+    """The CSV/XLSX files in a zip archive, after checking it against the zip bomb limits
+
+    Sizes recorded in the archive are checked here, but can be forged; the
+    bytes actually decompressed are counted again while members are read.
+    """
+    entries = archive.infolist()
+    if max_entries and len(entries) > max_entries:
+        raise DecompressionLimitExceeded(f"Archive holds {len(entries)} entries; the limit is {max_entries}")
+
+    # Folders and the metadata macOS adds to archives are not data files
+    members = [
+        info for info in entries
+        if not info.is_dir()
+        and not info.filename.startswith('__MACOSX/')
+        and not os.path.basename(info.filename).startswith('.')
+    ]
+    unsupported = [info.filename for info in members if not info.filename.lower().endswith(ARCHIVE_MEMBER_EXTENSIONS)]
+    if unsupported:
+        raise ValueError(f"Archive may only contain CSV and XLSX files: {', '.join(unsupported)}")
+    encrypted = [info.filename for info in members if info.flag_bits & 0x1]
+    if encrypted:
+        raise ValueError(f"Encrypted archive entries are not supported: {', '.join(encrypted)}")
+    if not members:
+        raise ValueError("Archive contains no CSV or XLSX files")
+
+    declared_size = sum(info.file_size for info in members)
+    if max_bytes and declared_size > max_bytes:
+        raise DecompressionLimitExceeded(f"Archive expands to {declared_size} bytes; the limit is {max_bytes}")
+    return members
+
+
+def stream_zip(
+        file_path: str,
+        csv_chunk_size: int,
+        excel_chunk_size: int,
+        max_bytes: int,
+        max_entries: int,
+        chunk_callback: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, SheetChunks]:
+    """Open a zip archive of CSV and XLSX files as SheetChunks streams.
+
+    Each CSV member becomes a sheet named after the file, and each XLSX member
+    contributes its worksheets, so an archive uploads like one workbook. CSV
+    members are inflated straight into the parser. openpyxl needs random access
+    to a workbook, so XLSX members (themselves zip containers) are copied out
+    next to the upload and removed when their sheets are closed. Every byte
+    inflated counts towards ``max_bytes``.
+    """
+    budget = DecompressionBudget(max_bytes)
+    with zipfile.ZipFile(file_path) as archive:
+        members = archive_members(archive, max_bytes, max_entries)
+
+    sheets: Dict[str, SheetChunks] = {}
+    used_names: Set[str] = set()
+    try:
+        for info in members:
+            if info.filename.lower().endswith('.csv'):
+                name = unique_sheet_name(os.path.splitext(os.path.basename(info.filename))[0], used_names)
+                sheets[name] = stream_csv(file_path, csv_chunk_size, chunk_callback, zip_member_reader(info, budget))
+                continue
+
+            workbook_path = extract_zip_member(file_path, info, budget)
+            workbook_sheets = stream_xlsx(workbook_path, excel_chunk_size, on_close=lambda p=workbook_path: remove_file(p))
+            for title, sheet in workbook_sheets.items():
+                sheets[unique_sheet_name(title, used_names)] = sheet
+    except Exception:
+        for sheet in sheets.values():
+            sheet.close()
+        raise
+
+    return sheets
+
+
+def zip_member_reader(info: zipfile.ZipInfo, budget: DecompressionBudget) -> Callable[[BinaryIO], BinaryIO]:
+    """``decompress`` hook for stream_csv that inflates one archive member"""
+    return lambda raw: limited_reader(zipfile.ZipFile(raw).open(info), budget)
+
+
+def extract_zip_member(file_path: str, info: zipfile.ZipInfo, budget: DecompressionBudget,
+                       read_size: int = 64 * 1024) -> str:
+    """Copy an archive member into a temporary file beside the archive and return its path"""
+    handle, member_path = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(file_path) or None)
+    try:
+        with zipfile.ZipFile(file_path) as archive, archive.open(info) as source, os.fdopen(handle, 'wb') as target:
+            for data in iter(lambda: source.read(read_size), b''):
+                budget.consume(len(data))
+                target.write(data)
+    except Exception:
+        remove_file(member_path)
+        raise
+    return member_path
+
+
+def remove_file(path: str):
+    with suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def unique_sheet_name(name: str, used_names: Set[str]) -> str:
+    """``name``, numbered if a sheet of that name (ignoring case) is already taken"""
+    name = name or 'Sheet'
+    candidate = name
+    suffix = 2
+    while candidate.lower() in used_names:
+        candidate = f"{name} ({suffix})"
+        suffix += 1
+    used_names.add(candidate.lower())
+    return candidate
+
+
+def parse_sheets_in_parallel(file_path: str, sheet_names: List[str], workers: int) -> Dict[str, SheetChunks]:
+    """Parse and clean .xlsx sheets on the process pool, handing them back in sheet order
+
+    Each returned SheetChunks yields one cleaned DataFrame (with row hash
+    columns) and must be consumed in order, as process_valid_spreadsheet and
+    sync_spreadsheet do. At most ``workers * 2`` parsed sheets are in flight,
+    so a slow database cannot make parsed sheets pile up in memory.
+    """
+    pool = get_parse_pool(workers)
+    parsed = _iter_parsed_sheets(pool, file_path, sheet_names, workers * 2)
+
+    def sheet_chunks(expected_name: str) -> Iterator[pd.DataFrame]:
+        sheet_name, frame = next(parsed)
+        if sheet_name != expected_name:
+            raise RuntimeError(f"Parsed sheet {sheet_name} out of order, expected {expected_name}")
+        yield frame
+
+    # The shared generator cancels queued parses when any sheet is closed early
+    return {
+        name: SheetChunks([], sheet_chunks(name), on_close=parsed.close)
+        for name in sheet_names
+    }
+
+
+def get_parse_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the process-wide sheet parsing pool, creating it on first use"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # spawn, not fork: upload jobs run on threads and forking them is unsafe
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _parse_pool
+
+
+def _iter_parsed_sheets(
+        pool: ProcessPoolExecutor,
+        file_path: str,
+        sheet_names: List[str],
+        window: int
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """Yield (sheet name, cleaned DataFrame) in order, keeping ``window`` parses queued ahead"""
+    names = iter(sheet_names)
+    pending = deque()
+    try:
+        for name in names:
+            pending.append((name, pool.submit(parse_sheet, file_path, name)))
+            if len(pending) >= window:
+                break
+
+        while pending:
+            name, future = pending.popleft()
+            frame = future.result()
+            next_name = next(names, None)
+            if next_name is not None:
+                pending.append((next_name, pool.submit(parse_sheet, file_path, next_name)))
+            yield name, frame
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def parse_sheet(file_path: str, sheet_name: str) -> pd.DataFrame:
+    """Process pool worker: read one .xlsx sheet, normalize, clean and hash its rows"""
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name]
+        header = worksheet_header(worksheet)
+        frames = list(_iter_worksheet_chunks(worksheet, header, DEFAULT_EXCEL_CHUNK_SIZE))
+    finally:
+        workbook.close()
+
+    sheet_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=header)
+    sheet_df.columns = [normalize_column_name(str(col)) for col in sheet_df.columns]
+    if sheet_df.empty:
+        return sheet_df
+    return add_row_hashes(clean_sheet_data(sheet_df))
+
+
+def validate_sheet_structures(sheet_data: Dict[str, Union[pd.DataFrame, SheetChunks]], errors: List[str]):
     """Validate all sheets meet structural requirements"""
     for sheet_name, sheet_df in sheet_data.items():
         if sheet_name.lower() == 'credentials':
             continue
-
         sheet_df.columns = [normalize_column_name(col) for col in sheet_df.columns]
-        missing = REQUIRED_COLUMNS - set(sheet_df.columns)
+
+    validate_sheet_headers({name: sheet_df.columns for name, sheet_df in sheet_data.items()}, errors)
+
+
+def validate_sheet_headers(headers: Dict[str, Iterable[str]], errors: List[str]):
+    """Check each sheet's column names for the required columns"""
+    for sheet_name, columns in headers.items():
+        if sheet_name.lower() == 'credentials':
+            continue
+
+        missing = REQUIRED_COLUMNS - {normalize_column_name(str(col)) for col in columns}
 
         if missing:
             errors.append(
@@ -142,15 +752,18 @@ def validate_sheet_structures(sheet_data: Dict[str, pd.DataFrame], errors: List[
 def process_valid_spreadsheet(
         filename: str,
         user_id: int,
-        sheet_data: Dict[str, pd.DataFrame],
+        sheet_data: Dict[str, Union[pd.DataFrame, SheetChunks]],
         status: str,
-        progress_callback=None # <--- ADDED THIS PARAMETER
+        progress_callback: Optional[Callable[[str, int, int], None]] = None,
+        content_hash: Optional[str] = None,
+        metrics: Optional[IngestMetrics] = None
 ) -> str:
     """Process validated spreadsheet data into database"""
     new_spreadsheet = Spreadsheet(
         name=filename,
         user_id=user_id,
-        created_at=datetime.utcnow()
+        created_at=datetime.utcnow(),
+        content_hash=content_hash
     )
     db.session.add(new_spreadsheet)
     db.session.flush()
@@ -162,150 +775,329 @@ def process_valid_spreadsheet(
         if sheet_name.lower() == 'credentials':
             continue
 
-        # Call the progress_callback here
         if progress_callback:
-            progress_callback(sheet_name, processed_sheets + 1, total_sheets) # <--- MODIFIED TO USE THE PASSED CALLBACK
+            progress_callback(sheet_name, processed_sheets + 1, total_sheets)
 
-        process_sheet(new_spreadsheet.id, sheet_name, sheet_df)
+        process_sheet(new_spreadsheet.id, sheet_name, sheet_df, metrics)
         processed_sheets += 1
 
     logger.info(f"File '{filename}' successfully processed as {status}")
     return status
 
-# The `update_progress` function was causing confusion and is now replaced by the `progress_callback` mechanism
-# within `process_uploaded_file` and `process_valid_spreadsheet`.
-# You can remove this standalone `update_progress` function if it's no longer used anywhere else.
-# For now, I'll comment it out to show the primary fix.
-# def update_progress(user_id: int, processed: int, total: int, sheet_name: str):
-#     """Update global upload progress state"""
-#     progress = int((processed / total) * 100) if total > 0 else 0
-#     UPLOAD_PROGRESS[user_id] = {
-#         "status": f"Processing {sheet_name}",
-#         "progress": progress
-#     }
-
-
-def process_sheet(spreadsheet_id: int, sheet_name: str, sheet_df: pd.DataFrame):
+def process_sheet(
+        spreadsheet_id: int,
+        sheet_name: str,
+        sheet_df: Union[pd.DataFrame, SheetChunks],
+        metrics: Optional[IngestMetrics] = None
+):
+    """Create a sheet and insert its links.
+
+    ``sheet_df`` is either a whole DataFrame or a SheetChunks stream; streamed
+    chunks are cleaned and flushed one at a time so only one chunk is held in
+    memory.
+    """
+    metrics = metrics or IngestMetrics()
     try:
         if not spreadsheet_id or not isinstance(spreadsheet_id, int):
             raise ValueError(f"Invalid spreadsheet ID: {spreadsheet_id}")
         if not sheet_name or not isinstance(sheet_name, str):
             raise ValueError(f"Invalid sheet name: {sheet_name}")
-        if not isinstance(sheet_df, pd.DataFrame):
-            raise TypeError(f"Expected DataFrame, got {type(sheet_df)}")
+        if not isinstance(sheet_df, (pd.DataFrame, SheetChunks)):
+            raise TypeError(f"Expected DataFrame or SheetChunks, got {type(sheet_df)}")
 
         logger.info(f"Processing sheet: {sheet_name} for spreadsheet {spreadsheet_id}")
-        logger.debug(f"Initial data sample:\n{sheet_df.head(2)}")
 
         sheet = Sheet(name=sheet_name, spreadsheet_id=spreadsheet_id)
         db.session.add(sheet)
         db.session.flush()  # Ensure sheet.id is available
 
-        if sheet_df.empty:
-            logger.warning(f"Empty sheet detected: {sheet_name}")
-            return
+        chunks = [sheet_df] if isinstance(sheet_df, pd.DataFrame) else sheet_df
+        keys = LinkKeys()
+        total_links = 0
+        for chunk in metrics.track_chunks(chunks):
+            total_links += insert_sheet_chunk(sheet, chunk, metrics, keys)
 
-        sheet_df = clean_sheet_data(sheet_df)
-        if sheet_df.empty:
+        if not total_links:
             logger.warning(f"Sheet {sheet_name} empty after cleaning")
             return
 
-        required_columns = {'title', 'link'}
-        missing_cols = required_columns - set(sheet_df.columns)
-        if missing_cols:
-            raise ValueError(f"Missing columns in {sheet_name}: {missing_cols}")
-
-        logger.info(f"Inserting {len(sheet_df)} links for sheet {sheet.id}")
-
-        links = [
-            Link(
-                sheet_id=sheet.id,
-                title=row['title'],
-                link=row['link'],
-                status=row.get('status', 'unknown')
-            ) for _, row in sheet_df.iterrows()
-        ]
-        db.session.add_all(links)
-        logger.debug(f"Added {len(links)} links for sheet {sheet.id}")
+        logger.debug(f"Added {total_links} links for sheet {sheet.id}")
 
     except Exception as e:
         logger.error(f"Error processing sheet {sheet_name}: {e}", exc_info=True)
         raise
 
+
+def insert_sheet_chunk(
+        sheet: Sheet,
+        chunk_df: pd.DataFrame,
+        metrics: Optional[IngestMetrics] = None,
+        keys: Optional['LinkKeys'] = None
+) -> int:
+    """Clean one chunk of sheet rows and flush its links; returns the number of links written
+
+    ``keys`` must be shared by all chunks of the sheet so duplicate rows in
+    different chunks get distinct row keys.
+    """
+    if chunk_df.empty:
+        return 0
+
+    metrics = metrics or IngestMetrics()
+    logger.debug(f"Chunk data sample:\n{chunk_df.head(2)}")
+    with metrics.phase('clean'):
+        chunk_df = clean_sheet_data(chunk_df)
+    if chunk_df.empty:
+        return 0
+
+    required_columns = {'title', 'link'}
+    missing_cols = required_columns - set(chunk_df.columns)
+    if missing_cols:
+        raise ValueError(f"Missing columns in {sheet.name}: {missing_cols}")
+
+    logger.info(f"Inserting {len(chunk_df)} links for sheet {sheet.id}")
+    with metrics.phase('insert'):
+        written = insert_links(sheet.id, chunk_df, keys=keys)
+    metrics.rows_written += written
+    return written
+
+
 def clean_sheet_data(sheet_df: pd.DataFrame) -> pd.DataFrame:
     """Clean and normalize sheet data"""
+    # Blank columns are dropped, but required ones are kept: a chunk whose
+    # status cells are all empty must still get the 'Unknown' default.
+    keep = sheet_df.notna().any() | sheet_df.columns.isin(REQUIRED_COLUMNS)
     return (
         sheet_df
-        .dropna(how='all', axis=1)
+        .loc[:, keep]
         .fillna({'status': 'Unknown'})
         .dropna(subset=['title', 'link'], how='any')  # Ensure both title and link exist
-        .assign(status=lambda x: x['status'].str[:50])  # Prevent varchar overflow
+        .assign(status=lambda x: x['status'].astype(str).str[:50])  # Prevent varchar overflow
     )
 
 
-def insert_links(sheet_id: int, sheet_df: pd.DataFrame, batch_size: int = 500):
-    """Batch insert links with validation"""
-    valid_columns = get_valid_link_columns()
-
-    # Clean data before processing
-    cleaned_df = (
-        sheet_df
-        .pipe(clean_sheet_data)
-        .loc[:, lambda df: df.columns.isin(valid_columns)]
+def insert_links(
+        sheet_id: int,
+        sheet_df: pd.DataFrame,
+        batch_size: Optional[int] = None,
+        keys: Optional['LinkKeys'] = None
+) -> int:
+    """Bulk insert cleaned sheet rows into links; returns the number of rows inserted
+
+    On PostgreSQL (psycopg2) rows are streamed with ``COPY FROM STDIN``; other
+    dialects get Core ``insert()`` executemany batches. Either way rows go
+    straight from the DataFrame columns to the database, bypassing ORM object
+    construction and the unit of work. ``sheet_df`` must already have been
+    through clean_sheet_data. Rows without a ``row_key`` column get keys from
+    ``keys`` (a fresh LinkKeys, i.e. an empty sheet, when not given).
+    """
+    if sheet_df.empty:
+        return 0
+
+    if 'row_key' not in sheet_df.columns:
+        sheet_df = (keys or LinkKeys()).assign(sheet_df)
+
+    batch_size = batch_size or current_app.config.get('INSERT_BATCH_SIZE', DEFAULT_INSERT_BATCH_SIZE)
+    if supports_copy():
+        return copy_links(sheet_id, sheet_df, batch_size)
+
+    rows = link_rows(sheet_id, sheet_df)
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(insert(Link.__table__), rows[start:start + batch_size])
+
+    return len(rows)
+
+
+def supports_copy() -> bool:
+    """Whether the session's database can take links through psycopg2 COPY"""
+    if not current_app.config.get('USE_POSTGRES_COPY', True):
+        return False
+    dialect = db.session.get_bind().dialect
+    return dialect.name == 'postgresql' and dialect.driver == 'psycopg2'
+
+
+def copy_links(sheet_id: int, sheet_df: pd.DataFrame, batch_size: int) -> int:
+    """Stream cleaned sheet rows into links with COPY FROM STDIN, ``batch_size`` rows per buffer"""
+    frame = pd.DataFrame({
+        'sheet_id': sheet_id,
+        'title': sheet_df['title'].astype(str),
+        'link': sheet_df['link'].astype(str),
+        'status': sheet_df['status'] if 'status' in sheet_df.columns else 'unknown',
+        'pinned': False,
+        'row_key': sheet_df['row_key'],
+    })
+    statement = (
+        "COPY links (sheet_id, title, link, status, pinned, row_key) "
+        "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (title, link, status))"
     )
 
-    # Convert to records and add sheet_id
-    rows = cleaned_df.to_dict(orient="records")
-    for row in rows:
-        row['sheet_id'] = sheet_id
+    # Runs on the session's own connection so it joins the upload transaction
+    cursor = db.session.connection().connection.cursor()
+    try:
+        for start in range(0, len(frame), batch_size):
+            buffer = io.StringIO()
+            frame.iloc[start:start + batch_size].to_csv(buffer, header=False, index=False)
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+    finally:
+        cursor.close()
 
-    # Batch process with progress tracking
-    for i in range(0, len(rows), batch_size):
-        batch = rows[i:i + batch_size]
-        try:
-            execute_batch_insert(batch)
-        except IntegrityError:
-            # Fallback to individual inserts for better error reporting
-            logger.warning("Batch insert failed, attempting individual inserts...")
-            for single_row in batch:
-                try:
-                    execute_batch_insert([single_row])
-                except IntegrityError as e:
-                    logger.error(f"Failed to insert row: {single_row} - Error: {str(e)}")
-                    continue
+    return len(frame)
 
 
-def get_valid_link_columns() -> set:
-    """Get valid column names for links table"""
-    inspector = inspect(db.engine)
-    return {col['name'] for col in inspector.get_columns('links')}
+def link_rows(sheet_id: int, sheet_df: pd.DataFrame) -> List[dict]:
+    """Build links table parameter rows column-wise from a cleaned sheet DataFrame"""
+    if 'status' in sheet_df.columns:
+        statuses = sheet_df['status'].tolist()
+    else:
+        statuses = ['unknown'] * len(sheet_df)
+
+    return [
+        {'sheet_id': sheet_id, 'title': title, 'link': link, 'status': status, 'pinned': False, 'row_key': row_key}
+        for title, link, status, row_key in zip(
+            sheet_df['title'].astype(str).tolist(),
+            sheet_df['link'].astype(str).tolist(),
+            statuses,
+            sheet_df['row_key'].tolist()
+        )
+    ]
 
 
 def execute_batch_insert(rows: List[dict]):
-    """Execute batch insert with conflict handling"""
+    """Upsert link rows and commit; rows without a ``row_key`` merge on their first (title, link) occurrence"""
     if not rows:
         return
 
     try:
-        # Explicitly list the conflict columns
-        conflict_columns = ['sheet_id', 'title', 'link']
-
-        query = text(f"""
-            INSERT INTO links ({', '.join(f'"{c}"' for c in rows[0].keys())})
-            VALUES ({', '.join(f':{c}' for c in rows[0].keys())})
-            ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE
-            SET {', '.join(f'"{k}" = EXCLUDED."{k}"'
-                           for k in rows[0].keys()
-                           if k not in conflict_columns)}
-        """)
-
-        db.session.execute(query, rows)
+        upsert_links([
+            row if row.get('row_key') else {**row, 'row_key': link_row_key(row_hash(row['title'], row['link']))}
+            for row in rows
+        ])
         db.session.commit()
     except Exception as e:
         logger.error(f"Batch insert failed: {str(e)}")
         db.session.rollback()
         raise
 
+
+def upsert_links(rows: List[dict], batch_size: Optional[int] = None) -> int:
+    """Insert link rows, updating title, link and status where (sheet_id, row_key) already exists
+
+    PostgreSQL and SQLite get ``INSERT ... ON CONFLICT (sheet_id, row_key) DO
+    UPDATE``, one statement per batch; ``pinned`` and ids of existing rows are
+    kept, which INSERT OR REPLACE would not do. Other dialects look up the
+    batch's existing keys and issue one update and one insert executemany per
+    batch. Within the rows the last one for a key wins. Returns the number of
+    rows written.
+    """
+    rows = list({(row['sheet_id'], row['row_key']): row for row in rows}.values())
+    if not rows:
+        return 0
+
+    batch_size = batch_size or current_app.config.get('INSERT_BATCH_SIZE', DEFAULT_INSERT_BATCH_SIZE)
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        for start in range(0, len(rows), batch_size):
+            merge_links(rows[start:start + batch_size])
+        return len(rows)
+
+    statement = dialect_insert(Link.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=['sheet_id', 'row_key'],
+        set_={
+            'title': statement.excluded.title,
+            'link': statement.excluded.link,
+            'status': statement.excluded.status,
+        }
+    )
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(statement, rows[start:start + batch_size])
+    return len(rows)
+
+
+def merge_links(rows: List[dict]):
+    """Portable upsert of one batch of link rows for dialects without ON CONFLICT"""
+    existing = set(db.session.execute(
+        select(Link.sheet_id, Link.row_key).where(
+            tuple_(Link.sheet_id, Link.row_key).in_([(row['sheet_id'], row['row_key']) for row in rows])
+        )
+    ).tuples())
+
+    updates = [
+        {'key_sheet_id': row['sheet_id'], 'key_row_key': row['row_key'],
+         'new_title': row['title'], 'new_link': row['link'], 'new_status': row['status']}
+        for row in rows if (row['sheet_id'], row['row_key']) in existing
+    ]
+    inserts = [{'pinned': False, **row} for row in rows if (row['sheet_id'], row['row_key']) not in existing]
+
+    if updates:
+        db.session.execute(
+            update(Link.__table__)
+            .where(Link.sheet_id == bindparam('key_sheet_id'), Link.row_key == bindparam('key_row_key'))
+            .values(title=bindparam('new_title'), link=bindparam('new_link'), status=bindparam('new_status')),
+            updates
+        )
+    if inserts:
+        db.session.execute(insert(Link.__table__), inserts)
+
+
+class LinkKeys:
+    """
+    Assigns ``links.row_key`` values within one sheet.
+
+    A row's key digests its (title, link) together with an occurrence
+    number, so duplicate rows in a sheet still get distinct keys and the
+    n-th copy of a row keeps the same key across re-imports. Keys already
+    stored for the sheet can be passed as ``taken``; they are skipped.
+    """
+
+    def __init__(self, taken: Iterable[str] = ()):
+        self._taken = set(taken)
+        self._next: Dict[bytes, int] = {}
+
+    def key(self, key_hash: bytes) -> str:
+        """Next free key for a row whose (title, link) digest is ``key_hash``"""
+        occurrence = self._next.get(key_hash, 0)
+        row_key = link_row_key(key_hash, occurrence)
+        while row_key in self._taken:
+            occurrence += 1
+            row_key = link_row_key(key_hash, occurrence)
+        self._next[key_hash] = occurrence + 1
+        return row_key
+
+    def assign(self, sheet_df: pd.DataFrame) -> pd.DataFrame:
+        """Add a ``row_key`` column to a cleaned sheet chunk"""
+        if '_key_hash' in sheet_df.columns:
+            key_hashes = sheet_df['_key_hash'].tolist()
+        else:
+            key_hashes = [
+                row_hash(title, link)
+                for title, link in zip(sheet_df['title'].astype(str), sheet_df['link'].astype(str))
+            ]
+        return sheet_df.assign(row_key=[self.key(key_hash) for key_hash in key_hashes])
+
+
+def link_row_key(key_hash: bytes, occurrence: int = 0) -> str:
+    return hashlib.sha1(key_hash + occurrence.to_bytes(4, 'big')).hexdigest()
+
+
+def next_row_key(sheet_id: int, title: str, link: str, exclude_id: Optional[int] = None) -> str:
+    """Row key for a single link added to or edited in a sheet"""
+    taken = db.session.execute(
+        select(Link.row_key).where(
+            Link.sheet_id == sheet_id,
+            Link.title == title,
+            Link.link == link,
+            Link.id != exclude_id if exclude_id else true(),
+            Link.row_key.is_not(None)
+        )
+    ).scalars()
+    return LinkKeys(taken).key(row_hash(title, link))
+
+
 def cleanup_existing_spreadsheet(spreadsheet: Spreadsheet):
     """Clean up existing spreadsheet and related data"""
     try:
@@ -325,4 +1117,149 @@ def cleanup_existing_spreadsheet(spreadsheet: Spreadsheet):
     except SQLAlchemyError as e:
         logger.error(f"Cleanup failed: {str(e)}")
         db.session.rollback()
-        raise
\ No newline at end of file
+        raise
+
+
+def sync_spreadsheet(
+        spreadsheet: Spreadsheet,
+        sheet_data: Dict[str, Union[pd.DataFrame, SheetChunks]],
+        status: str,
+        progress_callback=None,
+        content_hash: Optional[str] = None,
+        metrics: Optional[IngestMetrics] = None
+) -> str:
+    """Bring an existing spreadsheet in line with re-uploaded sheet data
+
+    Sheets are matched by name. Matching sheets are diffed row by row (see
+    sync_sheet), new sheets are inserted, and sheets missing from the upload
+    are deleted along with their links.
+    """
+    spreadsheet.created_at = datetime.utcnow()
+    spreadsheet.content_hash = content_hash
+    existing_sheets = {sheet.name: sheet for sheet in spreadsheet.sheets}
+
+    sheet_names = [n for n in sheet_data if n.lower() != 'credentials']
+    for index, sheet_name in enumerate(sheet_names, start=1):
+        if progress_callback:
+            progress_callback(sheet_name, index, len(sheet_names))
+
+        sheet = existing_sheets.pop(sheet_name, None)
+        if sheet is None:
+            process_sheet(spreadsheet.id, sheet_name, sheet_data[sheet_name], metrics)
+        else:
+            sync_sheet(sheet, sheet_data[sheet_name], metrics)
+
+    for stale_sheet in existing_sheets.values():
+        logger.info(f"Removing sheet '{stale_sheet.name}' no longer present in upload")
+        db.session.execute(delete(Link.__table__).where(Link.sheet_id == stale_sheet.id))
+        db.session.delete(stale_sheet)
+
+    db.session.flush()
+    logger.info(f"File '{spreadsheet.name}' successfully synced as {status}")
+    return status
+
+
+def sync_sheet(
+        sheet: Sheet,
+        sheet_df: Union[pd.DataFrame, SheetChunks],
+        metrics: Optional[IngestMetrics] = None
+) -> Tuple[int, int, int]:
+    """Apply only the row changes between stored links and the uploaded sheet
+
+    Rows are keyed by (title, link) and compared on a hash of (title, link,
+    status): unknown keys are inserted, keys whose hash changed have their
+    status updated in place (keeping ``pinned``), and stored rows that no
+    longer appear are deleted. Duplicate keys are paired up in id order.
+    Inserts and updates go out together through upsert_links, one statement
+    per batch. Returns the (inserted, updated, deleted) counts.
+    """
+    metrics = metrics or IngestMetrics()
+    stored: Dict[bytes, Deque[Tuple[int, bytes, Optional[str]]]] = {}
+    with metrics.phase('diff'):
+        for link_id, title, link, link_status, row_key in db.session.execute(
+                select(Link.id, Link.title, Link.link, Link.status, Link.row_key)
+                .where(Link.sheet_id == sheet.id)
+                .order_by(Link.id)
+        ):
+            stored.setdefault(row_hash(title, link), deque()).append(
+                (link_id, row_hash(title, link, link_status), row_key)
+            )
+        keys = LinkKeys(row_key for candidates in stored.values() for _, _, row_key in candidates if row_key)
+
+    batch_size = current_app.config.get('INSERT_BATCH_SIZE', DEFAULT_INSERT_BATCH_SIZE)
+    # Only for rows stored without a row key, which upserts cannot address
+    update_statement = (
+        update(Link.__table__)
+        .where(Link.id == bindparam('link_id'))
+        .values(status=bindparam('new_status'))
+    )
+    inserted = updated = 0
+
+    chunks = [sheet_df] if isinstance(sheet_df, pd.DataFrame) else sheet_df
+    for chunk in metrics.track_chunks(chunks):
+        if chunk.empty:
+            continue
+        with metrics.phase('clean'):
+            chunk = clean_sheet_data(chunk)
+            if '_row_hash' not in chunk.columns:
+                chunk = add_row_hashes(chunk)
+
+        merges: List[dict] = []
+        unkeyed_changes: List[dict] = []
+        chunk_inserted = 0
+        with metrics.phase('diff'):
+            for title, link, key_hash, full_hash, link_status in zip(
+                    chunk['title'].astype(str), chunk['link'].astype(str),
+                    chunk['_key_hash'], chunk['_row_hash'], chunk['status']):
+                candidates = stored.get(key_hash)
+                if not candidates:
+                    row_key = keys.key(key_hash)
+                    chunk_inserted += 1
+                else:
+                    link_id, stored_hash, row_key = candidates.popleft()
+                    if stored_hash == full_hash:
+                        continue
+                    if row_key is None:
+                        unkeyed_changes.append({'link_id': link_id, 'new_status': link_status})
+                        continue
+                merges.append({
+                    'sheet_id': sheet.id, 'title': title, 'link': link,
+                    'status': link_status, 'pinned': False, 'row_key': row_key
+                })
+
+        with metrics.phase('insert'):
+            upsert_links(merges, batch_size)
+            for start in range(0, len(unkeyed_changes), batch_size):
+                db.session.execute(update_statement, unkeyed_changes[start:start + batch_size])
+        chunk_updated = len(merges) - chunk_inserted + len(unkeyed_changes)
+        inserted += chunk_inserted
+        updated += chunk_updated
+        metrics.rows_written += chunk_inserted + chunk_updated
+
+    stale_ids = [link_id for candidates in stored.values() for link_id, _, _ in candidates]
+    with metrics.phase('insert'):
+        for start in range(0, len(stale_ids), batch_size):
+            db.session.execute(
+                delete(Link.__table__).where(Link.id.in_(stale_ids[start:start + batch_size]))
+            )
+
+    logger.info(
+        f"Synced sheet {sheet.name}: {inserted} inserted, {updated} updated, {len(stale_ids)} deleted"
+    )
+    return inserted, updated, len(stale_ids)
+
+
+def add_row_hashes(sheet_df: pd.DataFrame) -> pd.DataFrame:
+    """Add ``_key_hash`` (title, link) and ``_row_hash`` (title, link, status) columns to a cleaned sheet"""
+    titles = sheet_df['title'].astype(str).tolist()
+    links = sheet_df['link'].astype(str).tolist()
+    statuses = sheet_df['status'].tolist()
+    return sheet_df.assign(
+        _key_hash=[row_hash(title, link) for title, link in zip(titles, links)],
+        _row_hash=[row_hash(*values) for values in zip(titles, links, statuses)]
+    )
+
+
+def row_hash(*values) -> bytes:
+    """Stable digest of a link row's values, used to compare uploads with stored rows"""
+    return hashlib.sha1('\x1f'.join(str(value) for value in values).encode('utf-8')).digest()
@@ -0,0 +1,78 @@
+"""
+Synthetic upload files shaped like app/static/files/template.xlsx.
+
+Each sheet has the template's "Title " / "Link" header (trailing space
+included) plus the required "Status" column. Sheets are named after the
+template's sections, numbered once those run out.
+
+Usage:
+    python -m benchmarks.synthetic out.xlsx --rows 50000 --sheets 5 --string-length 40
+"""
+import argparse
+import csv
+import itertools
+import os
+
+from openpyxl import Workbook
+
+HEADER = ['Title ', 'Link', 'Status']
+TEMPLATE_SHEETS = ['Zoom Calls', 'Operations', 'Human Resources', 'Marketing', 'Sales']
+STATUSES = ['Active', 'Pending', 'Done', 'Blocked']
+
+
+def sheet_names(count: int):
+    names = TEMPLATE_SHEETS[:count]
+    names += [f"Section {i}" for i in range(len(names) + 1, count + 1)]
+    return names
+
+
+def synthetic_rows(rows: int, string_length: int, sheet_index: int = 0):
+    """Yield (title, link, status) rows; titles and link paths are padded to ``string_length``"""
+    for i in range(rows):
+        title = f"Item {sheet_index}-{i} ".ljust(string_length, 'x')
+        link = f"https://example.com/{sheet_index}/{i}/".ljust(string_length + 20, 'p')
+        yield title, link, STATUSES[i % len(STATUSES)]
+
+
+def write_csv(path: str, rows: int, string_length: int) -> str:
+    with open(path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(HEADER)
+        writer.writerows(synthetic_rows(rows, string_length))
+    return path
+
+
+def write_xlsx(path: str, rows: int, sheets: int, string_length: int) -> str:
+    """Write ``sheets`` sheets of ``rows`` rows each, streaming rows through a write-only workbook"""
+    workbook = Workbook(write_only=True)
+    for index, name in enumerate(sheet_names(sheets)):
+        worksheet = workbook.create_sheet(name)
+        for row in itertools.chain([HEADER], synthetic_rows(rows, string_length, index)):
+            worksheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def generate(path: str, rows: int, sheets: int = 1, string_length: int = 40) -> str:
+    """Write a synthetic upload; the format follows the extension (CSV is always one sheet)"""
+    if path.lower().endswith('.csv'):
+        return write_csv(path, rows, string_length)
+    if path.lower().endswith('.xlsx'):
+        return write_xlsx(path, rows, sheets, string_length)
+    raise ValueError(f"Unsupported extension: {os.path.splitext(path)[1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', help="Output file, .csv or .xlsx")
+    parser.add_argument('--rows', type=int, default=10000, help="Rows per sheet")
+    parser.add_argument('--sheets', type=int, default=1)
+    parser.add_argument('--string-length', type=int, default=40)
+    args = parser.parse_args()
+
+    generate(args.path, args.rows, args.sheets, args.string_length)
+    print(f"Wrote {args.path} ({os.path.getsize(args.path):,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Helpers for revisions in versions/; env.py puts this directory on sys.path"""
+import logging
+from typing import List
+from alembic import op
+from sqlalchemy import inspect
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def has_column(table: str, column: str) -> bool:
+    """Whether the migration's database already has ``table.column`` (create_all may have made it)"""
+    return column in {col['name'] for col in inspect(op.get_bind()).get_columns(table)}
+
+
+def create_index_if_missing(name: str, table: str, columns: List, unique: bool = False, **kw):
+    """Create an index from a migration unless it exists, without locking writes on PostgreSQL
+
+    CREATE INDEX CONCURRENTLY cannot run inside a transaction, so on
+    PostgreSQL the index is built in an autocommit block. Extra keyword
+    arguments (``postgresql_using``, ``postgresql_ops``) go to op.create_index.
+    """
+    bind = op.get_bind()
+    if name in {index['name'] for index in inspect(bind).get_indexes(table)}:
+        return
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True, **kw)
+    else:
+        op.create_index(name, table, columns, unique=unique, **kw)
+    logger.info(f"Created index {name} on {table}")
+
+
+def drop_index_if_exists(name: str, table: str):
+    bind = op.get_bind()
+    if name not in {index['name'] for index in inspect(bind).get_indexes(table)}:
+        return
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
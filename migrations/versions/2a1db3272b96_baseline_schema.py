@@ -0,0 +1,67 @@
+"""baseline schema
+
+The tables as they were before migrations were introduced. Databases
+created by db.create_all() already have them and only get stamped.
+
+Revision ID: 2a1db3272b96
+Revises: 
+Create Date: 2026-10-17 06:44:42.605872
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a1db3272b96'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in existing:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('username', sa.String(length=80), nullable=False, unique=True),
+            sa.Column('password_hash', sa.String(length=512), nullable=False),
+            sa.Column('active', sa.Boolean(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('last_login', sa.DateTime(), nullable=True),
+        )
+    if 'spreadsheets' not in existing:
+        op.create_table(
+            'spreadsheets',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(length=255), nullable=False),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+        )
+    if 'sheets' not in existing:
+        op.create_table(
+            'sheets',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('spreadsheet_id', sa.Integer(), sa.ForeignKey('spreadsheets.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('name', sa.String(length=255), nullable=False),
+        )
+    if 'links' not in existing:
+        op.create_table(
+            'links',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('sheet_id', sa.Integer(), sa.ForeignKey('sheets.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('title', sa.String(length=255), nullable=False),
+            sa.Column('link', sa.Text(), nullable=False),
+            sa.Column('status', sa.String(length=100), nullable=False),
+            sa.Column('pinned', sa.Boolean(), server_default='false', nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table('links')
+    op.drop_table('sheets')
+    op.drop_table('spreadsheets')
+    op.drop_table('users')
+
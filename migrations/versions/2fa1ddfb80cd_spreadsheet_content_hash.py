@@ -0,0 +1,30 @@
+"""spreadsheet content hash
+
+Lets an unchanged re-upload be skipped.
+
+Revision ID: 2fa1ddfb80cd
+Revises: 2a1db3272b96
+Create Date: 2026-10-17 06:45:44.487686
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from schema_helpers import has_column
+
+
+# revision identifiers, used by Alembic.
+revision = '2fa1ddfb80cd'
+down_revision = '2a1db3272b96'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_column('spreadsheets', 'content_hash'):
+        op.add_column('spreadsheets', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('spreadsheets') as batch_op:
+        batch_op.drop_column('content_hash')
+
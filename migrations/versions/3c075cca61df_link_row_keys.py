@@ -0,0 +1,32 @@
+"""link row keys
+
+Identifies each link within its sheet, so re-uploads update rows in place.
+
+Revision ID: 3c075cca61df
+Revises: 2fa1ddfb80cd
+Create Date: 2026-10-17 06:45:45.994086
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from schema_helpers import create_index_if_missing, drop_index_if_exists, has_column
+
+
+# revision identifiers, used by Alembic.
+revision = '3c075cca61df'
+down_revision = '2fa1ddfb80cd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_column('links', 'row_key'):
+        op.add_column('links', sa.Column('row_key', sa.String(length=40), nullable=True))
+    create_index_if_missing('uq_links_sheet_row_key', 'links', ['sheet_id', 'row_key'], unique=True)
+
+
+def downgrade():
+    drop_index_if_exists('uq_links_sheet_row_key', 'links')
+    with op.batch_alter_table('links') as batch_op:
+        batch_op.drop_column('row_key')
+
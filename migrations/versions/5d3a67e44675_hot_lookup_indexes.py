@@ -0,0 +1,32 @@
+"""hot lookup indexes
+
+Indexes for the dashboard's spreadsheet, section and paginated link lookups.
+
+Revision ID: 5d3a67e44675
+Revises: 3c075cca61df
+Create Date: 2026-10-17 06:45:47.637468
+
+"""
+from schema_helpers import create_index_if_missing, drop_index_if_exists
+
+
+# revision identifiers, used by Alembic.
+revision = '5d3a67e44675'
+down_revision = '3c075cca61df'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_if_missing('ix_spreadsheets_user_name', 'spreadsheets', ['user_id', 'name'])
+    create_index_if_missing('ix_sheets_spreadsheet_id', 'sheets', ['spreadsheet_id'])
+    create_index_if_missing('ix_sheets_name', 'sheets', ['name'])
+    create_index_if_missing('ix_links_sheet_pinned_id', 'links', ['sheet_id', 'pinned', 'id'])
+
+
+def downgrade():
+    drop_index_if_exists('ix_links_sheet_pinned_id', 'links')
+    drop_index_if_exists('ix_sheets_name', 'sheets')
+    drop_index_if_exists('ix_sheets_spreadsheet_id', 'sheets')
+    drop_index_if_exists('ix_spreadsheets_user_name', 'spreadsheets')
+
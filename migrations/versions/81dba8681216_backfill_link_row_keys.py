@@ -0,0 +1,88 @@
+"""backfill link row keys
+
+Data migration: keys the links stored before links.row_key existed.
+
+The key scheme is copied here from app.utils (row_hash, link_row_key and
+LinkKeys as of this revision) so that later changes to the app cannot
+change what this migration writes.
+
+Revision ID: 81dba8681216
+Revises: 5d3a67e44675
+Create Date: 2026-10-17 06:47:04.913993
+
+"""
+from alembic import op
+import hashlib
+import logging
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '81dba8681216'
+down_revision = '5d3a67e44675'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+BATCH_SIZE = 1000
+
+links = sa.table(
+    'links',
+    sa.column('id', sa.Integer),
+    sa.column('sheet_id', sa.Integer),
+    sa.column('title', sa.String),
+    sa.column('link', sa.Text),
+    sa.column('row_key', sa.String),
+)
+
+
+def row_key(title: str, link: str, occurrence: int) -> str:
+    """Key of the ``occurrence``-th row with this (title, link) in its sheet"""
+    row_hash = hashlib.sha1(f'{title}\x1f{link}'.encode('utf-8')).digest()
+    return hashlib.sha1(row_hash + occurrence.to_bytes(4, 'big')).hexdigest()
+
+
+def upgrade():
+    connection = op.get_bind()
+    sheet_ids = connection.execute(
+        sa.select(links.c.sheet_id).where(links.c.row_key.is_(None)).distinct()
+    ).scalars().all()
+
+    statement = (
+        links.update()
+        .where(links.c.id == sa.bindparam('link_id'))
+        .values(row_key=sa.bindparam('new_row_key'))
+    )
+    for sheet_id in sheet_ids:
+        rows = connection.execute(
+            sa.select(links.c.id, links.c.title, links.c.link, links.c.row_key)
+            .where(links.c.sheet_id == sheet_id)
+            .order_by(links.c.id)
+        ).all()
+
+        # Duplicate rows get successive occurrence numbers, skipping keys already stored
+        taken = {row.row_key for row in rows if row.row_key}
+        next_occurrence = {}
+        changes = []
+        for row in rows:
+            if row.row_key is not None:
+                continue
+            occurrence = next_occurrence.get((row.title, row.link), 0)
+            key = row_key(row.title, row.link, occurrence)
+            while key in taken:
+                occurrence += 1
+                key = row_key(row.title, row.link, occurrence)
+            next_occurrence[(row.title, row.link)] = occurrence + 1
+            changes.append({'link_id': row.id, 'new_row_key': key})
+
+        for start in range(0, len(changes), BATCH_SIZE):
+            connection.execute(statement, changes[start:start + BATCH_SIZE])
+
+    if sheet_ids:
+        logger.info(f"Assigned row keys to links in {len(sheet_ids)} sheets")
+
+
+def downgrade():
+    # Keys are harmless to keep, and links.row_key goes away with its own revision
+    pass
@@ -0,0 +1,45 @@
+"""links pinned not null
+
+Section pages read pinned and unpinned links as two ``pinned = true/false``
+ranges of ix_links_sheet_pinned_id (see app.pagination), which a NULL
+``pinned`` matches neither of. Links stored with NULL are unpinned, as the
+old in-memory sort treated them, and the column no longer accepts NULL.
+SQLite cannot add NOT NULL without rebuilding links, and the rebuild would
+lose the sheet foreign key's ON DELETE CASCADE, so there only the stored
+NULLs are updated; the app itself never writes NULL.
+
+Revision ID: 82b9837a8bc7
+Revises: 81dba8681216
+Create Date: 2026-10-17 07:02:31.418206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '82b9837a8bc7'
+down_revision = '81dba8681216'
+branch_labels = None
+depends_on = None
+
+links = sa.table('links', sa.column('pinned', sa.Boolean))
+
+
+def pinned_is_nullable() -> bool:
+    columns = sa.inspect(op.get_bind()).get_columns('links')
+    return next(column['nullable'] for column in columns if column['name'] == 'pinned')
+
+
+def upgrade():
+    op.execute(links.update().where(links.c.pinned.is_(None)).values(pinned=False))
+    # create_all has already made the column NOT NULL on databases it built
+    if op.get_bind().dialect.name != 'sqlite' and pinned_is_nullable():
+        op.alter_column('links', 'pinned', existing_type=sa.Boolean(), nullable=False,
+                        existing_server_default='false')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite' and not pinned_is_nullable():
+        op.alter_column('links', 'pinned', existing_type=sa.Boolean(), nullable=True,
+                        existing_server_default='false')
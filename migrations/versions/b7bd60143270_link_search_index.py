@@ -0,0 +1,93 @@
+"""link search index
+
+Substring search of links by title and URL (see app.search). PostgreSQL
+gets pg_trgm GIN indexes on title and URL, which serve its ILIKE
+conditions. SQLite gets an external-content FTS5 table with the trigram
+tokenizer that triggers keep in step with links. Databases without
+pg_trgm, FTS5 or the trigram tokenizer (SQLite before 3.34) search
+unindexed.
+
+Revision ID: b7bd60143270
+Revises: 82b9837a8bc7
+Create Date: 2026-10-17 06:50:12.337166
+
+"""
+from alembic import op
+import logging
+from sqlalchemy.exc import SQLAlchemyError
+from schema_helpers import create_index_if_missing, drop_index_if_exists
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7bd60143270'
+down_revision = '82b9837a8bc7'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+SQLITE_TRIGGERS = {
+    'links_search_insert': """
+        CREATE TRIGGER links_search_insert AFTER INSERT ON links BEGIN
+            INSERT INTO links_search(rowid, title, link) VALUES (new.id, new.title, new.link);
+        END""",
+    'links_search_delete': """
+        CREATE TRIGGER links_search_delete AFTER DELETE ON links BEGIN
+            INSERT INTO links_search(links_search, rowid, title, link) VALUES ('delete', old.id, old.title, old.link);
+        END""",
+    'links_search_update': """
+        CREATE TRIGGER links_search_update AFTER UPDATE OF title, link ON links BEGIN
+            INSERT INTO links_search(links_search, rowid, title, link) VALUES ('delete', old.id, old.title, old.link);
+            INSERT INTO links_search(rowid, title, link) VALUES (new.id, new.title, new.link);
+        END""",
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        upgrade_postgresql()
+    elif dialect == 'sqlite':
+        upgrade_sqlite()
+
+
+def upgrade_postgresql():
+    with op.get_context().autocommit_block():
+        try:
+            op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        except SQLAlchemyError as e:
+            logger.warning(f"pg_trgm is not available, link search will not be indexed: {e}")
+            return
+    create_index_if_missing('ix_links_title_trgm', 'links', ['title'],
+                            postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    create_index_if_missing('ix_links_link_trgm', 'links', ['link'],
+                            postgresql_using='gin', postgresql_ops={'link': 'gin_trgm_ops'})
+
+
+def upgrade_sqlite():
+    bind = op.get_bind()
+    existing = {name for name, in bind.exec_driver_sql("SELECT name FROM sqlite_master")}
+    if 'links_search' not in existing:
+        try:
+            op.execute(
+                "CREATE VIRTUAL TABLE links_search USING fts5("
+                "title, link, content='links', content_rowid='id', tokenize='trigram')"
+            )
+        except SQLAlchemyError as e:
+            logger.warning(f"SQLite cannot build the trigram links_search index, link search will not be indexed: {e}")
+            return
+    for name, statement in SQLITE_TRIGGERS.items():
+        if name not in existing:
+            op.execute(statement)
+    op.execute("INSERT INTO links_search(links_search) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        drop_index_if_exists('ix_links_link_trgm', 'links')
+        drop_index_if_exists('ix_links_title_trgm', 'links')
+    elif dialect == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            op.execute(f'DROP TRIGGER IF EXISTS {name}')
+        op.execute('DROP TABLE IF EXISTS links_search')